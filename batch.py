@@ -0,0 +1,93 @@
+"""Curvas de desembolsos de todos los libros de un directorio, sin Streamlit.
+
+Calcula para cada libro las mismas curvas que las páginas (por proyecto, país,
+sector y proyecto sobre el aporte) y las escribe en Parquet y/o CSV, un libro
+por proceso.
+
+    python batch.py corte-2024-06/ --output curvas/ --format parquet csv --workers 4
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from curves import disbursement_curves
+from engine import CURVES
+from schema import coerce_sheets
+from workbook import CURVE_COLUMNS, read_sheets
+
+FORMATS = ('parquet', 'csv')
+
+
+def process_workbook(path, output_dir, formats=FORMATS, curves=tuple(CURVES)):
+    """Parsea `path` una vez, calcula sus curvas y devuelve las rutas escritas.
+
+    Si hay filas que no cumplen el esquema se escriben en filas_invalidas.csv.
+    """
+    with open(path, 'rb') as f:
+        desembolsos, operaciones, invalid = coerce_sheets(read_sheets(f.read(), CURVE_COLUMNS), CURVE_COLUMNS)
+
+    target = os.path.join(output_dir, os.path.splitext(os.path.basename(path))[0])
+    os.makedirs(target, exist_ok=True)
+    written = []
+    if len(invalid):
+        # Filas excluidas por no cumplir el esquema, para corregirlas en el libro
+        out = os.path.join(target, 'filas_invalidas.csv')
+        invalid.to_csv(out, index=False)
+        written.append(out)
+    for name in curves:
+        key, denominator = CURVES[name]
+        result_df = disbursement_curves(desembolsos, operaciones, key, denominator=denominator)
+        for fmt in formats:
+            out = os.path.join(target, f"{name}.{fmt}")
+            if fmt == 'parquet':
+                result_df.to_parquet(out, index=False)
+            else:
+                result_df.to_csv(out, index=False)
+            written.append(out)
+    return written
+
+
+def find_workbooks(directory):
+    # Se ignoran los archivos de bloqueo que deja Excel (~$libro.xlsx)
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith('.xlsx') and not name.startswith('~$')
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('directory', help='directorio con los libros .xlsx')
+    parser.add_argument('--output', default='curvas', help='directorio de salida (una carpeta por libro)')
+    parser.add_argument('--format', nargs='+', choices=FORMATS, default=['parquet'], dest='formats')
+    parser.add_argument('--curves', nargs='+', choices=list(CURVES), default=list(CURVES))
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    paths = find_workbooks(args.directory)
+    if not paths:
+        parser.error(f"no hay libros .xlsx en {args.directory}")
+
+    failed = 0
+    start = time.perf_counter()
+    # 'spawn', como el pool de parseo de la app
+    with ProcessPoolExecutor(max_workers=min(args.workers, len(paths)), mp_context=multiprocessing.get_context('spawn')) as pool:
+        futures = {pool.submit(process_workbook, path, args.output, args.formats, args.curves): path for path in paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                written = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"ERROR {path}: {exc!r}", file=sys.stderr)
+            else:
+                print(f"{path}: {len(written)} archivos")
+    print(f"{len(paths) - failed} de {len(paths)} libros en {time.perf_counter() - start:.1f} s")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
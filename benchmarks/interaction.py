@@ -0,0 +1,80 @@
+"""Latencia de cambiar la selección en las páginas de curvas.
+
+Compara el trabajo de un rerun completo de la página (lo que disparaba cada
+cambio del selectbox) con el de un rerun del fragmento de selección solamente.
+Se ejecuta sin servidor, con el archivo subido sustituido por el libro sintético,
+de modo que mide el cómputo y la serialización de cada rerun, no la red.
+
+    python -m benchmarks.interaction --projects 2000 --disbursements 60000
+"""
+import argparse
+import io
+import os
+import runpy
+import statistics
+import tempfile
+import time
+from unittest import mock
+
+import streamlit as st
+
+from benchmarks.synthetic import make_workbook
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {
+    'Hello.py': 'run',
+    'pages/Curva_Operaciones.py': 'run',
+    'pages/Curva_Paises.py': 'run',
+    'pages/Paises.py': 'run',
+    'pages/Pie.py': 'run',
+    'pages/Sectores.py': 'run_for_sector',
+}
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def measure(path, repeat=5):
+    with open(path, 'rb') as f:
+        data = f.read()
+    results = {}
+    for page, entry in PAGES.items():
+        module = runpy.run_path(os.path.join(ROOT, page), run_name='benchmark')
+        # Fuera de un servidor los fragmentos no se ejecutan: se mide la función que envuelven
+        show_selection = module['show_selection'].__wrapped__
+        module[entry].__globals__['show_selection'] = show_selection
+        with mock.patch.object(st, 'file_uploader', lambda *a, **k: io.BytesIO(data)), \
+                mock.patch.object(st, 'set_page_config', lambda *a, **k: None):
+            # Primera ejecución: parseo y cálculo quedan en caché, como tras la carga del archivo
+            module[entry]()
+            full_rerun = _timed(module[entry], repeat)
+            cube = module['process_cube'](io.BytesIO(data))
+            fragment_rerun = _timed(lambda: show_selection(cube, **module['CHARTS']), repeat)
+        results[page] = (full_rerun, fragment_rerun)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--disbursements', type=int, default=60000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = make_workbook(os.path.join(tmp, 'benchmark.xlsx'), args.projects, args.disbursements)
+        results = measure(path, args.repeat)
+
+    print(f"{'página':<30}{'rerun completo (ms)':>22}{'fragmento (ms)':>18}")
+    for page, (full_rerun, fragment_rerun) in results.items():
+        print(f"{page:<30}{full_rerun:>22.1f}{fragment_rerun:>18.1f}")
+
+
+if __name__ == '__main__':
+    main()
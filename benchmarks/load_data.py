@@ -0,0 +1,71 @@
+"""Combinación de las fuentes de pages/z.py: pivot en una pasada frente a groupby + merge.
+
+Compara `combine_sources` con la implementación anterior (tres groupby, dos merge
+externos, fillna y tres divisiones) a medida que crecen operaciones y años.
+
+    python -m benchmarks.load_data
+"""
+import argparse
+import os
+import runpy
+import statistics
+import tempfile
+import time
+
+import pandas as pd
+
+from benchmarks.synthetic import make_forecast_csvs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = ((100, 2), (500, 5), (2000, 10), (5000, 20))
+KEYS = ['Pais', 'IDOperacion', 'Year', 'Month']
+
+
+def legacy_combine(sources, country_map):
+    frames = []
+    for name, date_column, measure in (('operaciones', 'FechaEfectiva', 'Ejecutados'),
+                                       ('proyecciones', 'Fecha', 'Proyectados'),
+                                       ('proyecciones_iniciales', 'FechaProgramada', 'ProyeccionesIniciales')):
+        data = sources[name].copy()
+        data[measure] = pd.to_numeric(data['Monto'], errors='coerce')
+        data['Year'] = data[date_column].dt.year
+        data['Month'] = data[date_column].dt.month
+        data['Pais'] = data['IDOperacion'].str[:2].map(country_map)
+        frames.append(data.groupby(KEYS).agg({measure: 'sum'}).reset_index())
+    merged_data = pd.merge(frames[0], frames[1], on=KEYS, how='outer')
+    merged_data = pd.merge(merged_data, frames[2], on=KEYS, how='outer').fillna(0)
+    for measure in ('Ejecutados', 'Proyectados', 'ProyeccionesIniciales'):
+        merged_data[measure] = (merged_data[measure] / 1000000).round(2)
+    return merged_data
+
+
+def _timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows-per-operation', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    z = runpy.run_path(os.path.join(ROOT, 'pages', 'z.py'), run_name='benchmark')
+    print(f"{'operaciones':>12}{'años':>6}{'filas':>10}{'groupby+merge (ms)':>22}{'pivot (ms)':>14}{'mejora':>9}")
+    for operations, years in SIZES:
+        rows = operations * args.rows_per_operation
+        with tempfile.TemporaryDirectory() as tmp:
+            paths = make_forecast_csvs(tmp, operations, rows, years)
+            contents = {name: open(path, 'rb').read() for name, path in paths.items()}
+        sources = z['read_sources'](contents)
+        legacy = _timed(lambda: legacy_combine(sources, z['COUNTRY_MAP']), args.repeat)
+        pivot = _timed(lambda: z['combine_sources'](sources), args.repeat)
+        print(f"{operations:>12}{years:>6}{rows:>10}{legacy:>22.1f}{pivot:>14.1f}{legacy / pivot:>8.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Arranque en frío de cada página: importación y primer render.
+
+Cada medición se hace en un intérprete nuevo, como tras un despliegue o un
+escalado: se importa la página (sin ejecutarla) y luego se dibuja una vez con
+el libro sintético subido, sin snapshots previos. Se informa también qué
+dependencias pesadas quedaron cargadas tras importar la página.
+
+    python -m benchmarks.startup --projects 500 --disbursements 10000 --repeat 3
+"""
+import argparse
+import io
+import json
+import os
+import runpy
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from unittest import mock
+
+from benchmarks.interaction import PAGES, ROOT
+from benchmarks.synthetic import make_forecast_csvs, make_workbook
+
+PAGES = dict(PAGES, **{'pages/z.py': 'main'})
+# Funciones decoradas con st.fragment en las páginas y en table.py
+FRAGMENTS = ('show_selection', 'paged_table')
+HEAVY_MODULES = ('altair', 'openpyxl', 'pandas', 'pyarrow')
+SOURCE_VARIABLES = {
+    'operaciones': 'DESEMBOLSOS_URL_OPERACIONES',
+    'proyecciones': 'DESEMBOLSOS_URL_PROYECCIONES',
+    'proyecciones_iniciales': 'DESEMBOLSOS_URL_PROYECCIONES_INICIALES',
+}
+
+
+def child(page, workbook):
+    """Mide una página en este intérprete y escribe el resultado como JSON."""
+    import streamlit as st
+
+    with open(workbook, 'rb') as f:
+        data = f.read()
+
+    start = time.perf_counter()
+    module = runpy.run_path(os.path.join(ROOT, page), run_name='benchmark')
+    imported = time.perf_counter() - start
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    # Fuera de un servidor los fragmentos no se ejecutan: se mide la función que envuelven.
+    # Sólo los fragmentos: instrument.stage y otros decoradores también tienen __wrapped__
+    entry = module[PAGES[page]]
+    for name in FRAGMENTS:
+        if name in module:
+            entry.__globals__[name] = module[name].__wrapped__
+    with mock.patch.object(st, 'file_uploader', lambda *a, **k: io.BytesIO(data)), \
+            mock.patch.object(st, 'multiselect', lambda *a, **k: ['Todos']), \
+            mock.patch.object(st, 'set_page_config', lambda *a, **k: None):
+        start = time.perf_counter()
+        entry()
+        rendered = time.perf_counter() - start
+
+    print(json.dumps({'import': imported, 'render': rendered, 'loaded': loaded}))
+
+
+def measure(page, workbook, env):
+    output = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--child', page, '--workbook', workbook],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--projects', type=int, default=500)
+    parser.add_argument('--disbursements', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--workbook', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.workbook)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workbook = make_workbook(os.path.join(tmp, 'benchmark.xlsx'), args.projects, args.disbursements)
+        sources = make_forecast_csvs(tmp)
+        env = dict(os.environ, **{SOURCE_VARIABLES[name]: path for name, path in sources.items()})
+
+        print(f"{'página':<30}{'importación (ms)':>18}{'primer render (ms)':>20}  cargados al importar")
+        for page in PAGES:
+            runs = []
+            for i in range(args.repeat):
+                # Sin snapshots de ejecuciones anteriores: cada render parte en frío
+                env['DESEMBOLSOS_SNAPSHOT_DIR'] = os.path.join(tmp, f'snapshots-{i}-{page.replace("/", "_")}')
+                runs.append(measure(page, workbook, env))
+            imported = statistics.median(run['import'] for run in runs) * 1000
+            rendered = statistics.median(run['render'] for run in runs) * 1000
+            print(f"{page:<30}{imported:>18.1f}{rendered:>20.1f}  {', '.join(runs[-1]['loaded'])}")
+
+
+if __name__ == '__main__':
+    main()
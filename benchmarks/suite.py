@@ -0,0 +1,129 @@
+"""Tiempo y memoria pico de cada etapa del procesamiento, para varios tamaños de libro.
+
+Etapas medidas por tamaño:
+  - parseo de las dos hojas con las columnas de CURVE_COLUMNS (en este proceso)
+  - process_dataframe de cada página de curvas y process_dataframe_for_sector,
+    con las hojas ya parseadas
+  - dataframe_to_excel_bytes del resultado por proyecto
+  - envolventes p10/p50/p90 entre proyectos de todos los países y sectores
+  - load_data de pages/z.py sobre los tres CSV, sin caché de datos
+  - monthly_cube y get_monthly_data de pages/z.py
+
+Todo corre sin red ni servidor. La memoria pico es la de tracemalloc (asignaciones
+de Python y de numpy) en una ejecución aparte de las cronometradas.
+
+    python -m benchmarks.suite --sizes 100x2000 500x10000 2000x60000 --output suite.csv
+"""
+import argparse
+import csv
+import io
+import os
+import runpy
+import statistics
+import tempfile
+import time
+import tracemalloc
+from unittest import mock
+
+import workbook
+from benchmarks.interaction import PAGES, ROOT
+from benchmarks.synthetic import COUNTRY_PREFIXES, SECTORS, make_forecast_csvs, make_workbook
+from curves import country_of, project_envelopes, yearly_cube
+from export import dataframe_to_excel_bytes
+
+DEFAULT_SIZES = ('100x2000', '500x10000', '2000x60000')
+PROCESS_FUNCTIONS = {page: 'process_dataframe_for_sector' if entry == 'run_for_sector' else 'process_dataframe'
+                     for page, entry in PAGES.items()}
+
+
+def measure(fn, setup=None, repeat=3):
+    """Mediana de `repeat` ejecuciones cronometradas y memoria pico de una ejecución más."""
+    samples = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return statistics.median(samples) * 1000, peak / 1e6
+
+
+def stages(data, sources):
+    """(nombre, función, preparación) de cada etapa para un libro y sus CSV."""
+    def parse():
+        return tuple(workbook._parse_sheet(data, name, workbook.CURVE_COLUMNS) for name in workbook.SHEETS)
+
+    yield 'parseo de hojas', parse, None
+
+    # Las funciones de las páginas leen las hojas ya parseadas de la caché
+    workbook.load_sheets(io.BytesIO(data), workbook.CURVE_COLUMNS)
+    for page, function in PROCESS_FUNCTIONS.items():
+        module = runpy.run_path(os.path.join(ROOT, page), run_name='benchmark')
+        yield f"{page}::{function}", lambda fn=module[function]: fn(io.BytesIO(data)), None
+
+    hello = runpy.run_path(os.path.join(ROOT, 'Hello.py'), run_name='benchmark')
+    result_df = hello['process_dataframe'](io.BytesIO(data))
+    yield 'dataframe_to_excel_bytes', lambda: dataframe_to_excel_bytes(result_df), None
+
+    project_cube = yearly_cube(result_df, 'IDEtapa')
+    operaciones = workbook.load_sheets(io.BytesIO(data), workbook.CURVE_COLUMNS)[1].set_index('IDEtapa')
+    for key, groups in (('Pais', country_of(operaciones.index.to_series())), ('SECTOR', operaciones['SECTOR'])):
+        yield f'project_envelopes::{key}', lambda groups=groups.rename(key): project_envelopes(project_cube, groups), None
+
+    z = runpy.run_path(os.path.join(ROOT, 'pages', 'z.py'), run_name='benchmark')
+    yield 'z.py::load_data', lambda: z['load_data'](sources), z['_data_cache'].clear
+
+    merged_data = z['load_data'](sources)
+    year = int(merged_data['Year'].min())
+    yield 'z.py::monthly_cube', lambda: z['monthly_cube'](merged_data, ['Todos'], 'Todos'), z['_cube_cache'].clear
+    cube = z['monthly_cube'](merged_data, ['Todos'], 'Todos')
+    yield 'z.py::get_monthly_data', lambda: z['get_monthly_data'](cube, year), None
+
+
+def parse_size(size):
+    projects, disbursements = size.lower().split('x')
+    return int(projects), int(disbursements)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=list(DEFAULT_SIZES), help='proyectosxdesembolsos')
+    parser.add_argument('--sectors', type=int, default=len(SECTORS))
+    parser.add_argument('--countries', nargs='+', default=list(COUNTRY_PREFIXES), choices=COUNTRY_PREFIXES)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='CSV donde guardar los resultados')
+    args = parser.parse_args()
+
+    rows = []
+    print(f"{'tamaño':<12}{'etapa':<48}{'tiempo (ms)':>14}{'pico (MB)':>12}")
+    for size in args.sizes:
+        projects, disbursements = parse_size(size)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(workbook.snapshot, 'SNAPSHOT_DIR', os.path.join(tmp, 'snapshots')):
+            path = make_workbook(os.path.join(tmp, 'benchmark.xlsx'), projects, disbursements, args.sectors, args.countries)
+            sources = make_forecast_csvs(tmp, projects, disbursements, countries=args.countries)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for stage, fn, setup in stages(data, sources):
+                elapsed, peak = measure(fn, setup, args.repeat)
+                rows.append({'tamaño': size, 'etapa': stage, 'tiempo_ms': round(elapsed, 1), 'pico_mb': round(peak, 1)})
+                print(f"{size:<12}{stage:<48}{elapsed:>14.1f}{peak:>12.1f}")
+
+    if args.output:
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+            writer.writeheader()
+            writer.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
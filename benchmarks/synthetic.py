@@ -0,0 +1,98 @@
+"""Libros sintéticos con la estructura de los reales, para medir el rendimiento sin datos productivos."""
+import datetime as dt
+import random
+
+COUNTRY_PREFIXES = ('AR', 'BO', 'BR', 'PY', 'UR')
+SECTORS = ('Infraestructura Vial', 'Agua y Saneamiento', 'Energía', 'Desarrollo Urbano', 'Salud', 'Educación')
+
+
+def sector_names(count):
+    """Los `count` primeros sectores; si se piden más de los reales se numeran los extra."""
+    return list(SECTORS[:count]) + [f"Sector {i}" for i in range(len(SECTORS), count)]
+
+
+def make_workbook(path, projects=2000, disbursements=60000, sectors=len(SECTORS), countries=COUNTRY_PREFIXES, seed=0):
+    """Escribe en `path` un libro con las hojas 'Desembolsos' y 'Operaciones'.
+
+    Los proyectos se reparten entre los prefijos de país de `countries` y entre
+    `sectors` sectores.
+    """
+    from openpyxl import Workbook
+
+    rng = random.Random(seed)
+    sectors = sector_names(sectors)
+    workbook = Workbook(write_only=True)
+
+    operaciones = workbook.create_sheet('Operaciones')
+    operaciones.append(['IDEtapa', 'NombreOperacion', 'FechaVigencia', 'SECTOR', 'AporteFonplata', 'Moneda', 'Estado'])
+    vigencias = []
+    for i in range(projects):
+        id_etapa = f"{countries[i % len(countries)]}-{i:05d}"
+        vigencia = dt.datetime(2005, 1, 1) + dt.timedelta(days=rng.randrange(6000))
+        aporte = rng.randrange(5, 150) * 1_000_000
+        vigencias.append((id_etapa, vigencia, aporte))
+        operaciones.append([id_etapa, f"Operación {i}", vigencia, rng.choice(sectors), aporte, 'USD', 'Vigente'])
+
+    desembolsos = workbook.create_sheet('Desembolsos')
+    desembolsos.append(['IDDesembolso', 'IDEtapa', 'FechaEfectiva', 'Monto', 'Moneda', 'Observaciones'])
+    for i in range(disbursements):
+        id_etapa, vigencia, aporte = rng.choice(vigencias)
+        efectiva = vigencia + dt.timedelta(days=rng.randrange(3650))
+        monto = round(aporte * rng.uniform(0.005, 0.08), 2)
+        desembolsos.append([i + 1, id_etapa, efectiva, monto, 'USD', ''])
+
+    workbook.save(path)
+    return path
+
+
+def make_forecast_csvs(directory, operations=300, rows=20000, years=7, countries=COUNTRY_PREFIXES, seed=0):
+    """Escribe en `directory` los tres CSV de seguimiento que lee pages/z.py.
+
+    Devuelve el diccionario de fuentes para `load_data(sources=...)`.
+    """
+    import csv
+    import os
+
+    rng = random.Random(seed)
+    ids = [f"{countries[i % len(countries)]}-{i:04d}" for i in range(operations)]
+    start = dt.date(2024 - years, 1, 1)
+    span = years * 365
+
+    def write(name, date_column, date_format, count):
+        path = os.path.join(directory, f"{name}.csv")
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['IDOperacion', date_column, 'Monto'])
+            for _ in range(count):
+                date = start + dt.timedelta(days=rng.randrange(span))
+                writer.writerow([rng.choice(ids), date.strftime(date_format), rng.randrange(10, 5000) * 1000])
+        return path
+
+    return {
+        'operaciones': write('operaciones', 'FechaEfectiva', '%Y-%m-%d', rows),
+        'proyecciones': write('proyecciones', 'Fecha', '%d/%m/%Y', rows),
+        'proyecciones_iniciales': write('proyecciones_iniciales', 'FechaProgramada', '%d/%m/%Y', rows // 2),
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Genera un libro sintético y, opcionalmente, los CSV de seguimiento.')
+    parser.add_argument('path', help='ruta del xlsx a escribir')
+    parser.add_argument('--projects', type=int, default=2000)
+    parser.add_argument('--disbursements', type=int, default=60000)
+    parser.add_argument('--sectors', type=int, default=len(SECTORS))
+    parser.add_argument('--countries', nargs='+', default=list(COUNTRY_PREFIXES), choices=COUNTRY_PREFIXES)
+    parser.add_argument('--csv-dir', help='directorio donde escribir los CSV de pages/z.py')
+    parser.add_argument('--csv-rows', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    make_workbook(args.path, args.projects, args.disbursements, args.sectors, args.countries, args.seed)
+    if args.csv_dir:
+        make_forecast_csvs(args.csv_dir, args.projects, args.csv_rows, countries=args.countries, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
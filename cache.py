@@ -0,0 +1,230 @@
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import pandas as pd
+from streamlit.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Cantidad máxima de entradas que conserva cada caché del proceso
+DEFAULT_MAX_ENTRIES = int(os.environ.get("DESEMBOLSOS_CACHE_ENTRIES", "32"))
+# Memoria que pueden ocupar entre todas las cachés del proceso y por sesión (0 = sin límite)
+MEMORY_BUDGET = int(float(os.environ.get("DESEMBOLSOS_MEMORY_BUDGET_MB", "1024")) * 1e6)
+SESSION_BUDGET = int(float(os.environ.get("DESEMBOLSOS_SESSION_MEMORY_MB", "0")) * 1e6)
+# Fracción de un presupuesto que puede ocupar una sola entrada; las mayores no se cachean
+MAX_ENTRY_SHARE = float(os.environ.get("DESEMBOLSOS_CACHE_MAX_ENTRY_SHARE", "0.5"))
+
+
+def nbytes(value):
+    """Bytes aproximados que ocupa `value` (tablas, buffers y tuplas de ellos)."""
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, io.BytesIO):
+        return value.getbuffer().nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+# Sesión a la que se atribuyen las entradas creadas por un hilo que trabaja para otra
+_local = threading.local()
+
+
+def current_session():
+    """Sesión de Streamlit del rerun actual, o None fuera de una sesión."""
+    if getattr(_local, "session", None) is not None:
+        return _local.session
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else None
+
+
+@contextmanager
+def on_behalf_of(session):
+    """Atribuye a `session` las entradas que este hilo guarde dentro del bloque."""
+    previous = getattr(_local, "session", None)
+    _local.session = session
+    try:
+        yield
+    finally:
+        _local.session = previous
+
+
+class MemoryGovernor:
+    """Contabiliza los bytes de todas las cachés del proceso y desaloja por LRU.
+
+    Cada entrada se atribuye a la sesión que la calculó. Si el total supera
+    `budget`, o lo de una sesión supera `session_budget`, se desalojan las
+    entradas usadas hace más tiempo, de cualquier caché: la próxima consulta
+    las vuelve a calcular. Una entrada mayor que `max_share` de un presupuesto
+    no se admite: desalojaría casi todo lo demás en cada rerun.
+    """
+
+    def __init__(self, budget=MEMORY_BUDGET, session_budget=SESSION_BUDGET, max_share=MAX_ENTRY_SHARE):
+        self.budget = budget
+        self.session_budget = session_budget
+        self.max_share = max_share
+        # (caché, clave) -> (bytes, sesión), en orden de uso
+        self._entries = OrderedDict()
+        self._total = 0
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def admits(self, size):
+        """Indica si una entrada de `size` bytes puede cachearse."""
+        return all(not budget or size <= budget * self.max_share for budget in (self.budget, self.session_budget))
+
+    def charge(self, cache, key, size, session):
+        with self._lock:
+            self._release((cache, key))
+            self._entries[(cache, key)] = (size, session)
+            self._total += size
+            self._sessions[session] = self._sessions.get(session, 0) + size
+            evicted = self._over_budget(session)
+        self._evict(evicted)
+
+    def touch(self, cache, key):
+        with self._lock:
+            if (cache, key) in self._entries:
+                self._entries.move_to_end((cache, key))
+
+    def release(self, cache, key):
+        with self._lock:
+            self._release((cache, key))
+
+    def _release(self, entry):
+        if entry not in self._entries:
+            return
+        size, session = self._entries.pop(entry)
+        self._total -= size
+        self._sessions[session] -= size
+        if not self._sessions[session]:
+            del self._sessions[session]
+
+    def _over_budget(self, session):
+        evicted = []
+        if self.session_budget and session is not None:
+            for entry, (size, owner) in list(self._entries.items()):
+                if self._sessions.get(session, 0) <= self.session_budget:
+                    break
+                if owner == session:
+                    self._release(entry)
+                    evicted.append((entry, size))
+        while self.budget and self._total > self.budget and self._entries:
+            entry = next(iter(self._entries))
+            size = self._entries[entry][0]
+            self._release(entry)
+            evicted.append((entry, size))
+        return evicted
+
+    def _evict(self, evicted):
+        # Fuera del lock propio: cada caché toma el suyo al descartar la entrada
+        for (cache, key), size in evicted:
+            cache._discard(key)
+            LOGGER.info("memoria: se desaloja una entrada de %s (%.1f MB)", cache.name, size / 1e6)
+
+    def usage(self):
+        """Bytes en uso: total, presupuesto, por sesión y por caché."""
+        with self._lock:
+            caches = {}
+            for (cache, _), (size, _) in self._entries.items():
+                caches[cache.name] = caches.get(cache.name, 0) + size
+            return {
+                "total": self._total,
+                "budget": self.budget,
+                "sessions": dict(self._sessions),
+                "caches": caches,
+            }
+
+
+GOVERNOR = MemoryGovernor()
+
+
+def memory_usage(session=False):
+    """Uso de memoria de las cachés; con `session=True`, sólo el total de la sesión actual."""
+    usage = GOVERNOR.usage()
+    if session:
+        return usage["sessions"].get(current_session(), 0)
+    return usage
+
+
+class LRUCache:
+    """Caché en memoria compartida entre sesiones, con desalojo LRU.
+
+    Además del límite de entradas, los bytes de cada entrada (medidos con
+    `sizeof`) cuentan para el presupuesto de `GOVERNOR`.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, name=None, sizeof=nbytes, governor=GOVERNOR):
+        self.max_entries = max_entries
+        self.name = name or f"cache-{id(self):x}"
+        self.sizeof = sizeof
+        self.governor = governor
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            value = self._data[key]
+        self.governor.touch(self, key)
+        return value
+
+    def put(self, key, value):
+        size = self.sizeof(value)
+        if not self.governor.admits(size):
+            # Se devuelve a quien la calculó, pero no se guarda ni desaloja otras entradas
+            LOGGER.warning("memoria: %s no guarda una entrada de %.1f MB, demasiado grande para el presupuesto", self.name, size / 1e6)
+            self._discard(key)
+            self.governor.release(self, key)
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.max_entries:
+                evicted.append(self._data.popitem(last=False)[0])
+        for old in evicted:
+            self.governor.release(self, old)
+        self.governor.charge(self, key, size, current_session())
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            keys = list(self._data)
+            self._data.clear()
+        for key in keys:
+            self.governor.release(self, key)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._data
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+_MISSING = object()
@@ -0,0 +1,153 @@
+import streamlit as st
+
+from curves import summary, summary_all
+from instrument import stage
+
+# Columnas que se redondean a dos decimales para mostrarlas
+ROUNDED = ('Porcentaje del Monto Acumulado',)
+
+
+def selectable_yearly_chart(data, key, measures, label):
+    """Gráficos anuales de todas las entidades con un desplegable que filtra en el navegador.
+
+    `data` tiene una fila por (`key`, 'Ano') y `measures` es una lista de
+    (columna, color, título). Cambiar de entidad lo resuelve Vega-Lite, sin
+    volver a ejecutar el script en el servidor.
+    """
+    import altair as alt
+
+    entities = data[key].drop_duplicates().tolist()
+    selection = alt.param(
+        name='entidad',
+        value=entities[0] if entities else None,
+        bind=alt.binding_select(options=entities, name=label),
+    )
+    base = alt.Chart(data).transform_filter(alt.datum[key] == selection)
+    charts = [
+        base.mark_line(point=True, color=color).encode(
+            x=alt.X('Ano:O', axis=alt.Axis(title='Año', labelAngle=0)),
+            y=f'{column}:Q',
+            tooltip=[key, 'Ano', column]
+        ).properties(
+            title=title,
+            width=600,
+            height=400
+        )
+        for column, color, title in measures
+    ]
+    return alt.vconcat(*charts).add_params(selection)
+
+
+def envelope_charts(data, key, title, label=None):
+    """Banda p10–p90 entre proyectos con su mediana y su promedio, un gráfico por medida.
+
+    `data` son filas de `curves.project_envelopes`. Sin `label` deben ser de una
+    sola entidad; con `label` se agrega un desplegable de entidades que filtra en
+    el navegador, como en `selectable_yearly_chart`.
+    """
+    import altair as alt
+
+    selection = None
+    if label is not None:
+        entities = data[key].drop_duplicates().tolist()
+        selection = alt.param(
+            name='entidad',
+            value=entities[0] if entities else None,
+            bind=alt.binding_select(options=entities, name=label),
+        )
+    x = alt.X('Ano:O', axis=alt.Axis(title='Año', labelAngle=0))
+    charts = []
+    for measure in data['Medida'].drop_duplicates():
+        base = alt.Chart(data).transform_filter(alt.datum.Medida == measure)
+        if selection is not None:
+            base = base.transform_filter(alt.datum[key] == selection)
+        band = base.mark_area(opacity=0.3, color='steelblue').encode(
+            x=x,
+            y=alt.Y('p10:Q', title=measure),
+            y2='p90:Q',
+            tooltip=[key, 'Ano', 'p10', 'p50', 'p90', 'Proyectos']
+        )
+        median = base.mark_line(color='steelblue', strokeDash=[4, 4]).encode(x=x, y='p50:Q')
+        mean = base.mark_line(point=True, color='black').encode(
+            x=x,
+            y='Promedio:Q',
+            tooltip=[key, 'Ano', 'Promedio', 'Proyectos']
+        )
+        charts.append((band + median + mean).properties(
+            title=f'{measure} {title}',
+            width=600,
+            height=400
+        ))
+    chart = alt.vconcat(*charts)
+    return chart.add_params(selection) if selection is not None else chart
+
+
+def _empty(cube):
+    """Avisa y devuelve True si no quedaron filas válidas que graficar."""
+    if cube.empty:
+        st.info("No hay filas válidas para graficar. Revisa las filas excluidas del libro.")
+        return True
+    return False
+
+
+def _rounded(frame, rounded):
+    columns = list(rounded)
+    frame[columns] = frame[columns].round(2)
+    return frame
+
+
+@st.fragment
+@stage('gráficos')
+def show_selection(cube, key, columns, measures, entity, rounded=ROUNDED, envelope_df=None):
+    """Resumen y gráficos anuales de la entidad elegida en un desplegable.
+
+    `columns` son las columnas del resumen (ver `curves.summary`), `measures` una
+    lista de (columna, color, título) y `entity` el nombre de la entidad en los
+    textos ('Proyecto', 'País', ...). Como fragmento, cambiar de entidad sólo
+    vuelve a ejecutar esta función.
+    """
+    import altair as alt
+
+    if _empty(cube):
+        return
+
+    selected = st.selectbox(f'Selecciona el {entity}:', cube.index.unique(key))
+
+    combined_df = _rounded(summary(cube, selected, columns), rounded)
+    st.write("Resumen de Datos:")
+    st.write(combined_df)
+
+    for column, color, title in measures:
+        chart = alt.Chart(combined_df).mark_line(point=True, color=color).encode(
+            x=alt.X('Ano:O', axis=alt.Axis(title='Año', labelAngle=0)),
+            y=f'{column}:Q',
+            tooltip=['Ano', column]
+        ).properties(
+            title=f'{title} por año para {selected}',
+            width=600,
+            height=400
+        )
+        st.altair_chart(chart, use_container_width=True)
+
+    if envelope_df is not None:
+        st.write("Envolventes entre proyectos: banda p10–p90, mediana (discontinua) y promedio (negro).")
+        chart = envelope_charts(envelope_df[envelope_df[key] == selected], key, f'de los proyectos de {selected}')
+        st.altair_chart(chart, use_container_width=True)
+
+
+@stage('gráficos')
+def show_all(cube, key, columns, measures, entity, rounded=ROUNDED, envelope_df=None):
+    """Como `show_selection`, pero con las series de todas las entidades y el desplegable en el navegador."""
+    if _empty(cube):
+        return
+    # Se envían las series de todas las entidades una sola vez; el desplegable filtra en el navegador
+    yearly_df = _rounded(summary_all(cube, columns), rounded)
+    chart = selectable_yearly_chart(yearly_df, key, [
+        (column, color, f'{title} por año') for column, color, title in measures
+    ], f'{entity}: ')
+    st.altair_chart(chart, use_container_width=True)
+
+    if envelope_df is not None:
+        st.write("Envolventes entre proyectos: banda p10–p90, mediana (discontinua) y promedio (negro).")
+        chart = envelope_charts(envelope_df, key, f'de los proyectos por {entity.lower()}', label=f'{entity}: ')
+        st.altair_chart(chart, use_container_width=True)
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+
+from instrument import stage
+from schema import add_periods, coerce_dates
+
+COUNTRY_MAP = {'AR': 'Argentina', 'BO': 'Bolivia', 'BR': 'Brasil', 'PY': 'Paraguay', 'UR': 'Uruguay'}
+
+
+def country_of(id_etapa):
+    """País de cada operación según el prefijo de su IDEtapa."""
+    return id_etapa.str[:2].map(COUNTRY_MAP).fillna('Desconocido')
+
+
+def merge_periods(desembolsos, operaciones, columns=()):
+    """Une cada desembolso con su operación y calcula los períodos de schema.PERIODS desde la vigencia."""
+    with stage('merge', filas=len(desembolsos)):
+        merged_df = pd.merge(desembolsos, operaciones[['IDEtapa', 'FechaVigencia', *columns]], on='IDEtapa', how='left')
+    with stage('to_datetime', filas=len(merged_df)):
+        # Las hojas leídas con schema.CURVE_COLUMNS ya traen las fechas tipadas
+        for column in ('FechaEfectiva', 'FechaVigencia'):
+            merged_df[column], _ = coerce_dates(merged_df[column])
+    return add_periods(merged_df)
+
+
+def disbursement_curves(desembolsos, operaciones, key, denominator=None):
+    """Curva de desembolsos agrupada por `key` ('IDEtapa', 'Pais' o 'SECTOR').
+
+    Calcula 'Monto Acumulado', 'Porcentaje del Monto' y 'Porcentaje del Monto Acumulado'.
+    Los porcentajes son relativos al total de cada grupo o, si se indica
+    `denominator` (p. ej. 'AporteFonplata'), a esa columna de la operación.
+    Todas las operaciones por grupo son transformaciones vectorizadas.
+    """
+    columns = [c for c in (key, denominator) if c in operaciones.columns and c != 'IDEtapa']
+    merged_df = merge_periods(desembolsos, operaciones, columns)
+    if key == 'Pais':
+        merged_df['Pais'] = country_of(merged_df['IDEtapa'])
+
+    with stage('groupby/cumsum/porcentajes', clave=key, filas=len(merged_df)):
+        keys = [key, 'Ano', 'Meses', 'IDDesembolso'] + ([denominator] if denominator else [])
+        result_df = merged_df.groupby(keys)['Monto'].sum().reset_index()
+
+        groups = result_df[key]
+        result_df['Monto Acumulado'] = result_df['Monto'].groupby(groups).cumsum()
+        if denominator is None:
+            result_df['Porcentaje del Monto'] = result_df['Monto'] / result_df['Monto'].groupby(groups).transform('sum') * 100
+            result_df['Porcentaje del Monto Acumulado'] = result_df['Monto Acumulado'] / result_df['Monto Acumulado'].groupby(groups).transform('max') * 100
+        else:
+            result_df['Porcentaje del Monto'] = result_df['Monto'] / result_df[denominator] * 100
+            result_df['Porcentaje del Monto Acumulado'] = result_df['Monto Acumulado'] / result_df[denominator] * 100
+
+    if key == 'IDEtapa':
+        result_df['Pais'] = country_of(result_df['IDEtapa'])
+    return result_df
+
+
+@stage('cubo anual')
+def yearly_cube(result_df, key):
+    """Agregados por (entidad, Ano) de una curva ya calculada.
+
+    Se construye una vez por archivo; cada selección de entidad es luego un slice
+    del índice en lugar de un filtrado y varios groupby sobre toda la tabla.
+    """
+    return result_df.groupby([key, 'Ano']).agg(**{
+        'Suma de Monto': ('Monto', 'sum'),
+        'Promedio de Monto': ('Monto', 'mean'),
+        'Cantidad Desembolsos': ('Monto', 'size'),
+        'Monto Acumulado': ('Monto Acumulado', 'last'),
+        'Promedio de Monto Acumulado': ('Monto Acumulado', 'mean'),
+        'Porcentaje del Monto Acumulado': ('Porcentaje del Monto Acumulado', 'last'),
+        'Promedio del Porcentaje del Monto Acumulado': ('Porcentaje del Monto Acumulado', 'mean'),
+    })
+
+
+# Percentiles de las envolventes entre proyectos
+ENVELOPE_PERCENTILES = (10, 50, 90)
+ENVELOPE_MEASURES = ('Monto Acumulado', 'Porcentaje del Monto Acumulado')
+
+
+def _nanpercentiles(values, percentiles, axis):
+    """Como np.nanpercentile (interpolación lineal), con un único sort en lugar de un bucle por celda."""
+    values = np.sort(values, axis=axis)  # los NaN quedan al final
+    counts = np.sum(~np.isnan(values), axis=axis, keepdims=True)
+    results = []
+    for percentile in percentiles:
+        position = (counts - 1) * percentile / 100
+        lower = np.clip(np.floor(position).astype(int), 0, None)
+        upper = np.clip(np.ceil(position).astype(int), 0, None)
+        low = np.take_along_axis(values, lower, axis=axis)
+        high = np.take_along_axis(values, upper, axis=axis)
+        value = low + (high - low) * (position - lower)
+        results.append(np.where(counts > 0, value, np.nan).squeeze(axis))
+    return results
+
+
+@stage('envolventes')
+def project_envelopes(project_cube, groups, measures=ENVELOPE_MEASURES, percentiles=ENVELOPE_PERCENTILES):
+    """Envolventes p10/p50/p90 y promedio por año de las curvas de los proyectos de cada grupo.
+
+    `project_cube` es el cubo anual por ('IDEtapa', 'Ano') y `groups` asigna a
+    cada IDEtapa su grupo (país o sector). Las curvas se ubican en una matriz
+    densa grupo × proyecto × año: dentro de la vida de cada proyecto el
+    acumulado se arrastra a los años sin desembolsos, antes vale 0 y después
+    queda NaN. Todos los grupos se calculan en una sola pasada.
+    """
+    key = groups.name
+    cube = project_cube[list(measures)].reset_index()
+    cube[key] = cube['IDEtapa'].map(groups)
+    cube = cube.dropna(subset=[key])
+    columns = [key, 'Ano', 'Medida', *(f'p{percentile}' for percentile in percentiles), 'Promedio', 'Proyectos']
+    if cube.empty:
+        return pd.DataFrame(columns=columns)
+
+    project_codes, projects = pd.factorize(cube['IDEtapa'])
+    group_codes, group_names = pd.factorize(cube[key], sort=True)
+    years = np.arange(cube['Ano'].min(), cube['Ano'].max() + 1)
+    year_codes = cube['Ano'].to_numpy() - years[0]
+
+    # Posición de cada proyecto dentro de su grupo
+    project_group = np.zeros(len(projects), dtype=int)
+    project_group[project_codes] = group_codes
+    order = np.argsort(project_group, kind='stable')
+    starts = np.searchsorted(project_group[order], np.arange(len(group_names)))
+    slot = np.empty(len(projects), dtype=int)
+    slot[order] = np.arange(len(projects)) - starts[project_group[order]]
+    width = np.bincount(project_group).max()
+
+    # Años con dato, último año con dato hasta cada columna, y vida de cada proyecto
+    observed = np.zeros((len(projects), len(years)), dtype=bool)
+    observed[project_codes, year_codes] = True
+    last = np.maximum.accumulate(np.where(observed, np.arange(len(years)), -1), axis=1)
+    first = np.argmax(observed, axis=1)[:, None]
+    end = len(years) - 1 - np.argmax(observed[:, ::-1], axis=1)[:, None]
+    before = np.arange(len(years)) < first
+    after = np.arange(len(years)) > end
+
+    frames = []
+    for measure in measures:
+        curves = np.full((len(projects), len(years)), np.nan)
+        curves[project_codes, year_codes] = cube[measure].to_numpy(dtype=float)
+        curves = np.take_along_axis(curves, np.maximum(last, 0), axis=1)
+        curves[before] = 0.0
+        curves[after] = np.nan
+
+        dense = np.full((len(group_names), width, len(years)), np.nan)
+        dense[project_group, slot] = curves
+        bands = _nanpercentiles(dense, percentiles, axis=1)
+        count = np.sum(~np.isnan(dense), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.nansum(dense, axis=1) / count
+
+        frame = pd.DataFrame({
+            key: np.repeat(np.asarray(group_names, dtype=object), len(years)),
+            'Ano': np.tile(years, len(group_names)),
+            'Medida': measure,
+            **{f'p{percentile}': band.ravel() for percentile, band in zip(percentiles, bands)},
+            'Promedio': mean.ravel(),
+            'Proyectos': count.ravel(),
+        }, columns=columns)
+        frames.append(frame[frame['Proyectos'] > 0])
+    return pd.concat(frames, ignore_index=True)
+
+
+def summary(cube, entity, columns):
+    """Serie anual de `entity` con las columnas del cubo renombradas según `columns`."""
+    return cube.loc[entity, list(columns)].rename(columns=columns).reset_index()
+
+
+def summary_all(cube, columns):
+    """Series anuales de todas las entidades del cubo, en formato largo."""
+    return cube[list(columns)].rename(columns=columns).reset_index()
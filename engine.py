@@ -0,0 +1,231 @@
+"""Motor de cálculo de las curvas: pandas en memoria o DuckDB sobre los snapshots.
+
+Con DESEMBOLSOS_CURVE_BACKEND=duckdb el merge por IDEtapa, los períodos y las
+sumas acumuladas y porcentajes por grupo se ejecutan en DuckDB directamente
+sobre la copia Parquet del snapshot, sin cargar las hojas ni materializar el
+merge en pandas. DuckDB lee por bloques y, con DESEMBOLSOS_DUCKDB_MEMORY_LIMIT,
+vuelca a disco lo que no entra en ese límite. El resultado tiene el mismo
+esquema que `curves.disbursement_curves` y se trae lote a lote a sus columnas
+finales. Las filas inválidas y las columnas de las envolventes también se leen
+del snapshot: con este motor las hojas completas sólo están en memoria mientras
+se parsea el libro por primera vez.
+"""
+import functools
+import os
+import tempfile
+
+import numpy as np
+
+from streamlit.logger import get_logger
+
+from curves import COUNTRY_MAP, country_of, disbursement_curves, project_envelopes, yearly_cube
+from instrument import stage
+from pool import submit
+from schema import CURVE_COLUMNS, PERIODS
+from workbook import cached_result, load_sheets, read_columns, snapshot_paths, workbook_digest
+
+LOGGER = get_logger(__name__)
+
+BACKEND = os.environ.get("DESEMBOLSOS_CURVE_BACKEND", "pandas")
+# Memoria máxima de DuckDB por consulta; lo que no entra se vuelca a disco. Vacío usa el
+# valor por defecto de DuckDB (80% de la RAM), que mantiene en memoria todo lo que puede
+DUCKDB_MEMORY_LIMIT = os.environ.get("DESEMBOLSOS_DUCKDB_MEMORY_LIMIT", "256MB")
+# Filas por lote al traer el resultado de DuckDB
+BATCH_ROWS = 100_000
+
+# Curvas de las páginas: nombre en la caché de resultados -> (agrupación, denominador)
+CURVES = {
+    'proyecto': ('IDEtapa', None),                    # Hello.py
+    'pais': ('Pais', None),                           # pages/Paises.py, pages/Curva_Paises.py
+    'sector': ('SECTOR', None),                       # pages/Sectores.py
+    'proyecto_aporte': ('IDEtapa', 'AporteFonplata'),  # pages/Pie.py, pages/Curva_Operaciones.py
+}
+# Envolventes entre proyectos: curva de la página -> agrupación de los proyectos
+ENVELOPES = {'pais': 'Pais', 'sector': 'SECTOR'}
+
+
+def workbook_curves(xls_path, key, denominator=None):
+    """Curva de desembolsos del libro agrupada por `key`, con el motor configurado."""
+    if BACKEND == "duckdb":
+        result_df = _duckdb_curves(xls_path, key, denominator)
+        if result_df is not None:
+            return result_df
+    desembolsos, operaciones = load_sheets(xls_path, CURVE_COLUMNS)
+    return disbursement_curves(desembolsos, operaciones, key, denominator=denominator)
+
+
+def precompute(xls_path, first=None):
+    """Calcula en segundo plano las curvas de CURVES, sus cubos anuales y las envolventes.
+
+    Los resultados quedan en la caché con los mismos nombres que usan las páginas
+    ('pais', 'pais_cubo', ...). La curva `first` se encola antes que las demás.
+    """
+    digest = workbook_digest(xls_path)
+    for name in sorted(CURVES, key=lambda name: name != first):
+        future = submit(('precálculo', digest, name), lambda name=name: _precompute_curve(xls_path, name))
+        future.add_done_callback(functools.partial(_log_failure, name))
+
+
+def _precompute_curve(xls_path, name):
+    curve_cube(xls_path, name)
+    if name in ENVELOPES:
+        envelopes(xls_path, name)
+
+
+def curve_cube(xls_path, name):
+    """Cubo anual de la curva `name` de CURVES, calculando y cacheando también la curva."""
+    key, denominator = CURVES[name]
+    result_df = cached_result(xls_path, name, lambda path: workbook_curves(path, key, denominator))
+    return cached_result(xls_path, f"{name}_cubo", lambda path: yearly_cube(result_df, key))
+
+
+def envelopes(xls_path, name):
+    """Envolventes entre proyectos de cada grupo de la curva `name` de ENVELOPES.
+
+    Ver curves.project_envelopes; se calculan para todos los países o sectores a la vez.
+    """
+    key = ENVELOPES[name]
+
+    def compute(path):
+        names = ['IDEtapa'] if key == 'Pais' else ['IDEtapa', key]
+        operaciones = read_columns(path, 'Operaciones', names).drop_duplicates('IDEtapa').set_index('IDEtapa')
+        if key == 'Pais':
+            groups = country_of(operaciones.index.to_series())
+        else:
+            groups = operaciones[key]
+        return project_envelopes(curve_cube(path, 'proyecto'), groups.rename(key))
+
+    return cached_result(xls_path, f"{name}_envolventes", compute)
+
+
+def _log_failure(name, future):
+    # La página que pida la curva la vuelve a calcular y muestra el error
+    if future.exception() is not None:
+        LOGGER.warning("El precálculo de la curva %s falló: %r", name, future.exception())
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _country_sql(column):
+    cases = " ".join(f"WHEN {_literal(prefix)} THEN {_literal(name)}" for prefix, name in COUNTRY_MAP.items())
+    return f"coalesce(CASE substr({column}, 1, 2) {cases} END, 'Desconocido')"
+
+
+def curves_sql(key, denominator=None):
+    """Consulta equivalente a `curves.disbursement_curves` sobre las tablas desembolsos y operaciones."""
+    operation_columns = CURVE_COLUMNS['Operaciones']
+
+    def source(column):
+        if column == 'Pais':
+            return _country_sql('d.IDEtapa')
+        table = 'o' if column in operation_columns and column != 'IDEtapa' else 'd'
+        return f"{table}.{_quote(column)}"
+
+    # Días completos entre vigencia y fecha efectiva, como Timedelta.days
+    days = "floor((epoch_us(d.FechaEfectiva) - epoch_us(o.FechaVigencia)) / 86400000000.0)"
+    periods = [f"CAST(trunc({days} / {length}) AS BIGINT) AS {_quote(name)}" for name, length in PERIODS.items()]
+    keys = [key, *PERIODS, 'IDDesembolso'] + ([denominator] if denominator else [])
+    quoted = ", ".join(_quote(column) for column in keys)
+    group = _quote(key)
+
+    if denominator is None:
+        percents = f"""
+            "Monto" / sum("Monto") OVER (PARTITION BY {group}) * 100 AS "Porcentaje del Monto",
+            "Monto Acumulado" / max("Monto Acumulado") OVER (PARTITION BY {group}) * 100 AS "Porcentaje del Monto Acumulado\""""
+    else:
+        percents = f"""
+            "Monto" / {_quote(denominator)} * 100 AS "Porcentaje del Monto",
+            "Monto Acumulado" / {_quote(denominator)} * 100 AS "Porcentaje del Monto Acumulado\""""
+    country = f", {_country_sql(group)} AS \"Pais\"" if key == 'IDEtapa' else ""
+
+    return f"""
+        WITH merged AS (
+            SELECT {source(key)} AS {group}, {", ".join(periods)}, d."IDDesembolso",
+                   {f"{source(denominator)} AS {_quote(denominator)}," if denominator else ""}
+                   d."Monto"
+            FROM desembolsos d LEFT JOIN operaciones o ON d."IDEtapa" = o."IDEtapa"
+        ),
+        grouped AS (
+            -- groupby de pandas descarta las claves nulas y suma 0 en grupos sin montos
+            SELECT {quoted}, CAST(coalesce(sum("Monto"), 0) AS DOUBLE) AS "Monto"
+            FROM merged
+            WHERE {" AND ".join(f"{_quote(column)} IS NOT NULL" for column in keys)}
+            GROUP BY {quoted}
+        ),
+        accumulated AS (
+            SELECT *, sum("Monto") OVER (PARTITION BY {group} ORDER BY {quoted} ROWS UNBOUNDED PRECEDING) AS "Monto Acumulado"
+            FROM grouped
+        )
+        SELECT *,{percents}{country}
+        FROM accumulated
+        ORDER BY {quoted}
+    """
+
+
+def _fetch(con, sql):
+    """Resultado de `sql` como DataFrame, traído lote a lote de DuckDB.
+
+    El resultado queda en una tabla temporal de DuckDB, que vuelca a disco lo que
+    excede su límite de memoria, y se copia en lotes de BATCH_ROWS filas a las
+    columnas finales: además del DataFrame sólo hay un lote en memoria, nunca una
+    tabla Arrow completa.
+    """
+    import pandas as pd
+    import pyarrow as pa
+
+    con.execute(f"CREATE TEMP TABLE resultado AS {sql}")
+    rows = con.execute("SELECT count(*) FROM resultado").fetchone()[0]
+    reader = con.execute("SELECT * FROM resultado").to_arrow_reader(BATCH_ROWS)
+    # Los números van a arreglos ya dimensionados y el texto a large_string, el
+    # almacenamiento de la columna str
+    columns = {
+        field.name: [] if pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+        else np.empty(rows, dtype=field.type.to_pandas_dtype())
+        for field in reader.schema
+    }
+    start = 0
+    for batch in reader:
+        for name, array in zip(batch.schema.names, batch.columns):
+            if isinstance(columns[name], list):
+                # DuckDB libera cada lote entero: conservar un buffer suyo (el cast
+                # reutiliza el de caracteres) retendría el lote, así que se copia
+                columns[name].append(pa.concat_arrays([array.cast(pa.large_string())]))
+            else:
+                columns[name][start:start + len(array)] = array.to_numpy(zero_copy_only=False)
+        start += batch.num_rows
+    return pd.DataFrame({
+        name: pa.chunked_array(values, pa.large_string()).to_pandas() if isinstance(values, list) else values
+        for name, values in columns.items()
+    }, copy=False)
+
+
+def _duckdb_curves(xls_path, key, denominator):
+    try:
+        import duckdb
+    except ImportError as exc:
+        LOGGER.warning("DuckDB no está disponible (%s); se usa pandas", exc)
+        return None
+
+    paths = snapshot_paths(xls_path, CURVE_COLUMNS, parquet=True)
+    if paths is None:
+        LOGGER.info("Sin snapshot del libro; la curva %s se calcula con pandas", key)
+        return None
+
+    config = {"temp_directory": os.path.join(tempfile.gettempdir(), "desembolsos-duckdb")}
+    if DUCKDB_MEMORY_LIMIT:
+        config["memory_limit"] = DUCKDB_MEMORY_LIMIT
+    try:
+        with stage("duckdb", clave=key), duckdb.connect(config=config) as con:
+            # Lectura nativa de Parquet: DuckDB sólo lee las columnas y grupos de filas que usa
+            for name, path in zip(("desembolsos", "operaciones"), paths):
+                con.read_parquet(path).create_view(name)
+            return _fetch(con, curves_sql(key, denominator))
+    except (duckdb.Error, OSError) as exc:
+        LOGGER.warning("La consulta DuckDB de la curva %s falló (%s); se usa pandas", key, exc)
+        return None
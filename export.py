@@ -0,0 +1,90 @@
+import functools
+import hashlib
+import io
+
+import pandas as pd
+import streamlit as st
+
+from cache import LRUCache
+from instrument import stage
+from pool import cached
+
+# Filas por bloque al escribir el xlsx: acota la memoria de la conversión a objetos
+XLSX_CHUNK_ROWS = 10000
+
+FORMATS = {
+    'xlsx': ('Excel', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'csv': ('CSV', 'text/csv'),
+    'parquet': ('Parquet', 'application/vnd.apache.parquet'),
+}
+
+_exports = LRUCache(max_entries=8, name="exportaciones")
+
+
+def dataframe_to_excel_bytes(df):
+    """Escribe `df` en un xlsx con el modo de sólo escritura de openpyxl.
+
+    Las filas se vuelcan por bloques directamente al archivo, sin construir la
+    hoja completa en memoria como hace `DataFrame.to_excel`.
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Resultados')
+    sheet.append([str(column) for column in df.columns])
+    for start in range(0, len(df), XLSX_CHUNK_ROWS):
+        chunk = df.iloc[start:start + XLSX_CHUNK_ROWS]
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        for row in chunk.itertuples(index=False, name=None):
+            sheet.append(row)
+
+    output = io.BytesIO()
+    workbook.save(output)
+    output.seek(0)
+    return output
+
+
+def dataframe_to_csv_bytes(df):
+    return io.BytesIO(df.to_csv(index=False).encode('utf-8'))
+
+
+def dataframe_to_parquet_bytes(df):
+    output = io.BytesIO()
+    df.to_parquet(output, index=False)
+    output.seek(0)
+    return output
+
+
+_WRITERS = {'xlsx': dataframe_to_excel_bytes, 'csv': dataframe_to_csv_bytes, 'parquet': dataframe_to_parquet_bytes}
+
+
+def result_fingerprint(df):
+    """Huella del contenido de un DataFrame, para reutilizar exportaciones idénticas."""
+    digest = hashlib.sha256(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    return digest.hexdigest()
+
+
+def export_bytes(df, fmt):
+    """Contenido de `df` en el formato `fmt`, cacheado por huella del resultado."""
+    def compute():
+        with stage('exportación', formato=fmt, filas=len(df)):
+            return _WRITERS[fmt](df).getvalue()
+
+    return cached(_exports, (result_fingerprint(df), fmt), compute)
+
+
+def download_buttons(df, file_stem, label):
+    """Botones de descarga en xlsx, CSV y Parquet.
+
+    Cada archivo se genera sólo cuando se pulsa su botón y la descarga no vuelve
+    a ejecutar la página.
+    """
+    for column, (fmt, (name, mime)) in zip(st.columns(len(FORMATS)), FORMATS.items()):
+        column.download_button(
+            label=label if fmt == 'xlsx' else f"Descargar {name}",
+            data=functools.partial(export_bytes, df, fmt),
+            file_name=f"{file_stem}.{fmt}",
+            mime=mime,
+            on_click='ignore',
+        )
@@ -0,0 +1,166 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from streamlit.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Caché local de las descargas: un archivo con el contenido y otro con sus cabeceras
+CACHE_DIR = os.environ.get("DESEMBOLSOS_FETCH_CACHE_DIR", os.path.join(tempfile.gettempdir(), "desembolsos-fetch"))
+# Segundos durante los que una descarga se usa sin consultar al servidor
+DEFAULT_TTL = float(os.environ.get("DESEMBOLSOS_FETCH_TTL", "300"))
+# Tiempo máximo de espera por fuente sin copia local; las vencidas se revalidan en segundo plano
+TIMEOUT = float(os.environ.get("DESEMBOLSOS_FETCH_TIMEOUT", "10"))
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def _url_lock(url):
+    with _locks_guard:
+        return _locks.setdefault(url, threading.Lock())
+
+
+def _cache_paths(url):
+    name = hashlib.sha256(url.encode()).hexdigest()
+    return os.path.join(CACHE_DIR, name), os.path.join(CACHE_DIR, name + ".json")
+
+
+def _read_cached(url):
+    body_path, meta_path = _cache_paths(url)
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+        with open(body_path, "rb") as f:
+            return f.read(), meta
+    except (OSError, ValueError):
+        return None, None
+
+
+def _write_cached(url, body, meta):
+    body_path, meta_path = _cache_paths(url)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    if body is not None:
+        fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp_path, body_path)
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR)
+    with os.fdopen(fd, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _local_path(url):
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme == "file":
+        return urllib.request.url2pathname(parsed.path)
+    if parsed.scheme == "":
+        return url
+    return None
+
+
+def fetch(url, ttl=DEFAULT_TTL, timeout=TIMEOUT):
+    """Contenido de `url`, servido desde la caché local mientras no supere `ttl` segundos.
+
+    Una copia vencida se devuelve de inmediato y se revalida en segundo plano con
+    If-None-Match / If-Modified-Since: la página no espera al servidor. Sólo sin
+    copia local se descarga esperando hasta `timeout`. `url` también puede ser una
+    ruta local o una URL file://.
+    """
+    path = _local_path(url)
+    if path is not None:
+        with open(path, "rb") as f:
+            return f.read()
+
+    body, meta = _read_cached(url)
+    if body is not None:
+        if time.time() - meta["fetched_at"] >= ttl:
+            _revalidate_in_background(url, ttl, timeout)
+        return body
+
+    with _url_lock(url):
+        # Otra petición pudo descargarla mientras esta esperaba
+        body, meta = _read_cached(url)
+        if body is not None:
+            return body
+        return _download(url, None, None, timeout)
+
+
+def _download(url, body, meta, timeout):
+    request = urllib.request.Request(url)
+    if body is not None:
+        if meta.get("etag"):
+            request.add_header("If-None-Match", meta["etag"])
+        if meta.get("last_modified"):
+            request.add_header("If-Modified-Since", meta["last_modified"])
+
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            new_body = response.read()
+            new_meta = {
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fetched_at": time.time(),
+            }
+    except urllib.error.HTTPError as exc:
+        if exc.code != 304 or body is None:
+            return _stale_or_raise(url, body, meta, exc)
+        # Sin cambios: se renueva el TTL de la copia local
+        meta["fetched_at"] = time.time()
+        _write_cached(url, None, meta)
+        return body
+    except (urllib.error.URLError, TimeoutError) as exc:
+        return _stale_or_raise(url, body, meta, exc)
+
+    _write_cached(url, new_body, new_meta)
+    return new_body
+
+
+def _stale_or_raise(url, body, meta, exc):
+    if body is None:
+        raise exc
+    # Se vuelve a intentar cuando vuelva a vencer, no en cada rerun
+    LOGGER.warning("No se pudo revalidar %s (%s); se usa la copia local", url, exc)
+    meta["fetched_at"] = time.time()
+    _write_cached(url, None, meta)
+    return body
+
+
+# Revalidaciones en curso por URL: como mucho una por fuente
+_revalidations = {}
+
+
+def _revalidate_in_background(url, ttl, timeout):
+    def revalidate():
+        try:
+            with _url_lock(url):
+                body, meta = _read_cached(url)
+                if body is not None and time.time() - meta["fetched_at"] >= ttl:
+                    _download(url, body, meta, timeout)
+        except Exception as exc:
+            LOGGER.warning("Falló la revalidación de %s: %r", url, exc)
+        finally:
+            with _locks_guard:
+                _revalidations.pop(url, None)
+
+    with _locks_guard:
+        if url in _revalidations:
+            return
+        thread = _revalidations[url] = threading.Thread(target=revalidate, name="revalidacion", daemon=True)
+    thread.start()
+
+
+def fetch_all(sources, ttl=DEFAULT_TTL, timeout=TIMEOUT):
+    """Descarga en paralelo `sources` ({nombre: url}) y devuelve {nombre: bytes}."""
+    with ThreadPoolExecutor(max_workers=max(len(sources), 1)) as pool:
+        futures = {name: pool.submit(fetch, url, ttl, timeout) for name, url in sources.items()}
+        return {name: future.result() for name, future in futures.items()}
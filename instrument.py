@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+from streamlit.logger import get_logger
+
+from cache import memory_usage
+
+LOGGER = get_logger(__name__)
+
+# Medición por etapa, desactivada salvo que se pida: DESEMBOLSOS_STAGE_TIMINGS=1
+ENABLED = os.environ.get("DESEMBOLSOS_STAGE_TIMINGS", "") not in ("", "0")
+
+# Streamlit ejecuta cada rerun en su propio hilo: las mediciones son de ese rerun
+_local = threading.local()
+
+
+def _records():
+    if not hasattr(_local, "records"):
+        _local.records = []
+    return _local.records
+
+
+def _rss():
+    """Memoria residente del proceso en bytes, o None si no puede leerse."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+@contextmanager
+def stage(name, **fields):
+    """Mide duración y variación de memoria residente de una etapa.
+
+    Cada medición se escribe como línea `clave=valor` en el log, con los valores
+    en JSON para que se pueda parsear, y queda para el panel de la barra lateral. Sirve también como decorador. Sin
+    DESEMBOLSOS_STAGE_TIMINGS no hace nada.
+    """
+    if not ENABLED:
+        yield
+        return
+    rss_before = _rss()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = (time.perf_counter() - start) * 1000
+        rss_after = _rss()
+        delta = None if rss_before is None or rss_after is None else (rss_after - rss_before) / 1e6
+        record = {"etapa": name, "ms": round(elapsed, 1), "memoria_mb": None if delta is None else round(delta, 1), **fields}
+        _records().append(record)
+        LOGGER.info(" ".join(f"{key}={json.dumps(value, ensure_ascii=False, default=str)}" for key, value in record.items()))
+
+
+@contextmanager
+def captured():
+    """Aparta las mediciones que este hilo haga dentro del bloque en la lista entregada."""
+    records = _records()
+    start = len(records)
+    moved = []
+    try:
+        yield moved
+    finally:
+        moved.extend(records[start:])
+        del records[start:]
+
+
+def adopt(records):
+    """Agrega a este rerun mediciones hechas en otro hilo por su cuenta."""
+    _records().extend(records)
+
+
+def sidebar_panel():
+    """Panel plegable con las etapas medidas en este rerun."""
+    records = _records()
+    if not ENABLED or not records:
+        return
+    with st.sidebar.expander("Tiempos por etapa"):
+        st.dataframe(records, hide_index=True)
+        st.caption(f"Total: {sum(record['ms'] for record in records):.1f} ms")
+        usage = memory_usage()
+        budget = f" de {usage['budget'] / 1e6:.0f} MB" if usage['budget'] else ""
+        st.caption(
+            f"Cachés: {usage['total'] / 1e6:.1f} MB{budget}, "
+            f"{memory_usage(session=True) / 1e6:.1f} MB de esta sesión"
+        )
+        # pool usa este módulo para sus mediciones: se importa al mostrar el panel
+        from pool import metrics
+
+        pool = metrics()
+        st.caption(
+            f"Pool de cálculo: {pool['en_curso']} en curso, {pool['en_espera']} en espera, "
+            f"{pool['coalescidos']} peticiones coalescidas; hilos: {pool['hilos']}"
+        )
+    records.clear()
@@ -1,76 +1,199 @@
 import streamlit as st
 import pandas as pd
-import calendar
-import altair as alt
-import matplotlib.pyplot as plt
 import numpy as np
+import calendar
+import hashlib
+import io
+import os
+from cache import LRUCache
+from export import result_fingerprint
+from fetch import fetch_all
+from instrument import sidebar_panel, stage
+from pool import cached
+from table import paged_table
+from streamlit.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Hojas publicadas como CSV en Google Sheets; cada URL puede reemplazarse por variable
+# de entorno con una ruta local, una URL file:// o un servidor HTTP de prueba
+SOURCES = {
+    'operaciones': os.environ.get('DESEMBOLSOS_URL_OPERACIONES', "https://docs.google.com/spreadsheets/d/e/2PACX-1vRFmOu4IjdEt7gLuAqjJTMvcpelmTr_IsL1WRy238YgRPDGLxsW74iMVUhYM2YegUblAKbLemfMxpW8/pub?gid=0&single=true&output=csv"),
+    'proyecciones': os.environ.get('DESEMBOLSOS_URL_PROYECCIONES', "https://docs.google.com/spreadsheets/d/e/2PACX-1vRFmOu4IjdEt7gLuAqjJTMvcpelmTr_IsL1WRy238YgRPDGLxsW74iMVUhYM2YegUblAKbLemfMxpW8/pub?gid=81813189&single=true&output=csv"),
+    'proyecciones_iniciales': os.environ.get('DESEMBOLSOS_URL_PROYECCIONES_INICIALES', "https://docs.google.com/spreadsheets/d/e/2PACX-1vRFmOu4IjdEt7gLuAqjJTMvcpelmTr_IsL1WRy238YgRPDGLxsW74iMVUhYM2YegUblAKbLemfMxpW8/pub?gid=1798498183&single=true&output=csv"),
+}
+
+COUNTRY_MAP = {'AR': 'ARGENTINA', 'BO': 'BOLIVIA', 'BR': 'BRASIL', 'PY': 'PARAGUAY', 'UR': 'URUGUAY'}
+
+# Tipos del DataFrame combinado. Los montos, ya redondeados a millones con dos
+# decimales, se mantienen en float64 para que las sumas mensuales no pierdan precisión
+SCHEMA = {
+    'Pais': pd.CategoricalDtype(sorted(COUNTRY_MAP.values())),
+    'IDOperacion': 'category',
+    'Year': 'int16',
+    'Month': 'int8',
+    'Ejecutados': 'float64',
+    'Proyectados': 'float64',
+    'ProyeccionesIniciales': 'float64',
+}
+
+# Por fuente: columna de fecha, opciones de lectura del CSV y medida que aporta
+MEASURES = (
+    ('operaciones', 'FechaEfectiva', {}, 'Ejecutados'),
+    ('proyecciones', 'Fecha', {'dayfirst': True}, 'Proyectados'),
+    ('proyecciones_iniciales', 'FechaProgramada', {'dayfirst': True}, 'ProyeccionesIniciales'),
+)
+
+# Datos ya combinados, por contenido de las tres fuentes
+_data_cache = LRUCache(max_entries=4, name="seguimiento")
+# Selecciones de país y cubos mensuales, por versión de los datos y selección
+_cube_cache = LRUCache(max_entries=32, name="cubos")
+
+# Gráficos de barras por país, por contenido del agregado que representan
+_chart_cache = LRUCache(max_entries=64, name="gráficos")
+
+MONTH_NAMES = [calendar.month_name[i].capitalize() for i in range(1, 13)]
 
 # Función para cargar datos desde Google Sheets
-def load_data():
-    url_operaciones = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRFmOu4IjdEt7gLuAqjJTMvcpelmTr_IsL1WRy238YgRPDGLxsW74iMVUhYM2YegUblAKbLemfMxpW8/pub?gid=0&single=true&output=csv"
-    url_proyecciones = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRFmOu4IjdEt7gLuAqjJTMvcpelmTr_IsL1WRy238YgRPDGLxsW74iMVUhYM2YegUblAKbLemfMxpW8/pub?gid=81813189&single=true&output=csv"
-    url_proyecciones_iniciales = "https://docs.google.com/spreadsheets/d/e/2PACX-1vRFmOu4IjdEt7gLuAqjJTMvcpelmTr_IsL1WRy238YgRPDGLxsW74iMVUhYM2YegUblAKbLemfMxpW8/pub?gid=1798498183&single=true&output=csv"
-
-    data_operaciones = pd.read_csv(url_operaciones, parse_dates=['FechaEfectiva'])
-    data_proyecciones = pd.read_csv(url_proyecciones, parse_dates=['Fecha'], dayfirst=True)
-    data_proyecciones_iniciales = pd.read_csv(url_proyecciones_iniciales, parse_dates=['FechaProgramada'], dayfirst=True)
-
-    data_operaciones['Monto'] = pd.to_numeric(data_operaciones['Monto'], errors='coerce')
-    data_proyecciones['Monto'] = pd.to_numeric(data_proyecciones['Monto'], errors='coerce')
-    data_operaciones['Ejecutados'] = data_operaciones['Monto']
-    data_proyecciones['Proyectados'] = data_proyecciones['Monto']
-    data_proyecciones_iniciales['Monto'] = pd.to_numeric(data_proyecciones_iniciales['Monto'], errors='coerce')
-    data_proyecciones_iniciales['ProyeccionesIniciales'] = data_proyecciones_iniciales['Monto']
-
-    data_operaciones['Year'] = data_operaciones['FechaEfectiva'].dt.year
-    data_operaciones['Month'] = data_operaciones['FechaEfectiva'].dt.month
-    data_proyecciones['Year'] = data_proyecciones['Fecha'].dt.year
-    data_proyecciones['Month'] = data_proyecciones['Fecha'].dt.month
-    data_proyecciones_iniciales['Year'] = data_proyecciones_iniciales['FechaProgramada'].dt.year
-    data_proyecciones_iniciales['Month'] = data_proyecciones_iniciales['FechaProgramada'].dt.month
+def load_data(sources=None):
+    # Las tres fuentes se descargan en paralelo y se revalidan sólo al vencer su TTL
+    with stage('descarga de fuentes'):
+        contents = fetch_all(sources or SOURCES)
+    key = tuple(hashlib.sha256(contents[name]).hexdigest() for name in sorted(contents))
+    merged_data = cached(_data_cache, key, lambda: build_data(contents))
+    # Versión de los datos: identifica los cubos derivados en _cube_cache
+    merged_data.attrs['version'] = key
+
+    paged_table(merged_data, key='seguimiento')
+    return merged_data
+
+
+def build_data(contents):
+    with stage('lectura de CSV', bytes=sum(len(content) for content in contents.values())):
+        sources = read_sources(contents)
+    with stage('pivot de medidas'):
+        return combine_sources(sources)
+
+
+def read_sources(contents):
+    return {
+        name: pd.read_csv(io.BytesIO(contents[name]), parse_dates=[date_column], **options)
+        for name, date_column, options, _ in MEASURES
+    }
+
+
+def combine_sources(sources):
+    # Formato largo: una fila por monto con la medida a la que pertenece
+    long_data = pd.concat([
+        pd.DataFrame({
+            'IDOperacion': sources[name]['IDOperacion'],
+            'Year': sources[name][date_column].dt.year,
+            'Month': sources[name][date_column].dt.month,
+            'Medida': measure,
+            'Monto': pd.to_numeric(sources[name]['Monto'], errors='coerce'),
+        })
+        for name, date_column, _, measure in MEASURES
+    ], ignore_index=True)
 
     # Agregar la columna 'Pais' basándonos en las dos primeras letras de 'IDOperacion'
-    data_operaciones['Pais'] = data_operaciones['IDOperacion'].str[:2].map({'AR': 'ARGENTINA', 'BO': 'BOLIVIA', 'BR': 'BRASIL', 'PY': 'PARAGUAY', 'UR': 'URUGUAY'})
-    data_proyecciones['Pais'] = data_proyecciones['IDOperacion'].str[:2].map({'AR': 'ARGENTINA', 'BO': 'BOLIVIA', 'BR': 'BRASIL', 'PY': 'PARAGUAY', 'UR': 'URUGUAY'})
-    data_proyecciones_iniciales['Pais'] = data_proyecciones_iniciales['IDOperacion'].str[:2].map({'AR': 'ARGENTINA', 'BO': 'BOLIVIA', 'BR': 'BRASIL', 'PY': 'PARAGUAY', 'UR': 'URUGUAY'})
+    long_data['Pais'] = long_data['IDOperacion'].str[:2].map(COUNTRY_MAP)
 
-    grouped_operaciones = data_operaciones.groupby(['Pais', 'IDOperacion', 'Year', 'Month']).agg({'Monto': 'sum'}).rename(columns={'Monto': 'Ejecutados'}).reset_index()
-    grouped_proyecciones = data_proyecciones.groupby(['Pais', 'IDOperacion', 'Year', 'Month']).agg({'Monto': 'sum'}).rename(columns={'Monto': 'Proyectados'}).reset_index()
-    # Agrupa data_proyecciones_iniciales por los campos necesarios
-    grouped_proyecciones_iniciales = data_proyecciones_iniciales.groupby(['Pais', 'IDOperacion', 'Year', 'Month']).agg({'ProyeccionesIniciales': 'sum'}).reset_index()
+    # Un único groupby pivotado reemplaza los tres groupby y los dos merge externos
+    merged_data = long_data.groupby(['Pais', 'IDOperacion', 'Year', 'Month', 'Medida'])['Monto'].sum().unstack('Medida', fill_value=0)
+    merged_data = merged_data.reindex(columns=[measure for *_, measure in MEASURES], fill_value=0)
 
-    # Combina los tres conjuntos de datos: operaciones, proyecciones y proyecciones iniciales
-    merged_data = pd.merge(grouped_operaciones, grouped_proyecciones, on=['Pais', 'IDOperacion', 'Year', 'Month'], how='outer')
-    merged_data = pd.merge(merged_data, grouped_proyecciones_iniciales, on=['Pais', 'IDOperacion', 'Year', 'Month'], how='outer').fillna(0)
+    # Conversiones finales y ajustes de escala, en una sola pasada sobre las tres medidas
+    merged_data = (merged_data / 1000000).round(2).reset_index().rename_axis(columns=None)
 
-    # Conversiones finales y ajustes de escala
-    merged_data['Ejecutados'] = (merged_data['Ejecutados'] / 1000000).round(2)
-    merged_data['Proyectados'] = (merged_data['Proyectados'] / 1000000).round(2)
-    merged_data['ProyeccionesIniciales'] = (merged_data['ProyeccionesIniciales'] / 1000000).round(2)
+    return apply_schema(merged_data)
 
-    st.write(merged_data)
-    return merged_data
 
+def apply_schema(data):
+    # El DataFrame se conserva entre reruns y se filtra en cada interacción:
+    # categorías y enteros pequeños reducen su memoria y aceleran isin/==
+    before = data.memory_usage(deep=True).sum()
+    data = data.astype(SCHEMA)
+    after = data.memory_usage(deep=True).sum()
+    LOGGER.info("Memoria de los datos de seguimiento: %.2f MB -> %.2f MB", before / 1e6, after / 1e6)
+    return data
+
+
+def _cached(data, key, compute):
+    version = data.attrs.get('version')
+    if version is None:
+        return compute()
+    return _cube_cache.get_or_compute((version,) + key, compute)
+
+
+def select_countries(data, countries):
+    """Datos de los países elegidos, con sus años y proyectos, cacheados por selección."""
+    countries = tuple(countries)
+
+    def compute():
+        filtered_data = data if "Todos" in countries else data[data['Pais'].isin(countries)]
+        years = sorted(filtered_data['Year'].astype(int).unique())
+        projects = filtered_data['IDOperacion'].unique().tolist()
+        return filtered_data, years, projects
+
+    return _cached(data, ('paises', countries), compute)
+
+
+def exact_totals(data, keys, columns):
+    """Sumas por grupo redondeadas a un decimal, sin depender del orden de las filas.
+
+    Los montos ya vienen redondeados a centésimas (combine_sources): se suman
+    como enteros y el redondeo a décimas es exacto, con las mitades hacia arriba.
+    """
+    cents = (data[columns] * 100).round().astype('int64')
+    totals = cents.groupby([data[key] for key in keys], observed=True).sum()
+    tenths = np.sign(totals) * ((totals.abs() + 5) // 10)
+    return tenths / 10
 
-def get_monthly_data(data, year):
-    data_year = data[data['Year'] == year]
 
-    # Agrupar los datos por mes y sumar los montos
-    grouped_data = data_year.groupby('Month').agg({'Proyectados': 'sum', 'Ejecutados': 'sum', 'ProyeccionesIniciales': 'sum'}).reset_index()
+def monthly_cube(data, countries, project):
+    """Totales Año × Mes × medida y Año × País de una selección, para todos los años.
+
+    Se calcula una vez por (países, proyecto); mover el slider de año sólo
+    recorta el cubo con `get_monthly_data` y `create_comparison_bar_chart`.
+    """
+    countries = tuple(countries)
+
+    def compute():
+        filtered_data, _, _ = select_countries(data, countries)
+        if project != "Todos":
+            filtered_data = filtered_data[filtered_data['IDOperacion'] == project]
+        monthly = filtered_data.groupby(['Year', 'Month'])[['Proyectados', 'Ejecutados', 'ProyeccionesIniciales']].sum()
+        by_country = exact_totals(filtered_data, ['Year', 'Pais'], ['Ejecutados', 'Proyectados'])
+        return monthly, by_country
+
+    return _cached(data, ('cubo', countries, project), compute)
+
+
+def _year_slice(frame, year):
+    if year in frame.index.get_level_values('Year'):
+        return frame.xs(year, level='Year')
+    return frame.iloc[:0].droplevel('Year')
+
+
+def get_monthly_data(cube, year):
+    monthly, _ = cube
+    grouped_data = _year_slice(monthly, year)
 
     # Reemplazar el número del mes con el nombre del mes en español
-    spanish_months = [calendar.month_name[i].capitalize() for i in range(1, 13)]
-    grouped_data['Month'] = grouped_data['Month'].apply(lambda x: spanish_months[x - 1])
+    grouped_data = grouped_data.set_axis(pd.Index(MONTH_NAMES).take(grouped_data.index - 1, allow_fill=False).rename('Month'))
 
     # Transponer el DataFrame para que los meses sean columnas y 'Proyectados' y 'Ejecutados' sean las filas
-    transposed_data = grouped_data.set_index('Month').T
+    transposed_data = grouped_data.T
 
     # Calcular los totales para cada fila
     transposed_data['Totales'] = transposed_data.sum(axis=1)
 
     return transposed_data
 
+@stage('gráficos')
 def create_line_chart_with_labels(data):
+    import altair as alt
+
     # Eliminar la columna 'Totales' del DataFrame para evitar que se muestre en el gráfico
     if 'Totales' in data.columns:
         data = data.drop(columns=['Totales'])
@@ -106,46 +229,42 @@ def create_line_chart_with_labels(data):
     return (line + text)
 
 
-def create_comparison_bar_chart(filtered_data, year):
-    # Filtrar los datos para el año seleccionado
-    data_year = filtered_data[filtered_data['Year'] == year]
+@stage('gráficos')
+def comparison_bar_chart(grouped_data):
+    import altair as alt
 
-    # Agrupar los datos por 'Pais' y calcular la suma de 'Ejecutados' y 'Proyectados', redondeando a un decimal
-    grouped_data = data_year.groupby('Pais', as_index=False).agg({
-        'Ejecutados': lambda x: round(x.sum(), 1),
-        'Proyectados': lambda x: round(x.sum(), 1)
-    })
+    # Formato largo: una barra por (Pais, medida), agrupadas por país
+    long_df = grouped_data.melt('Pais', value_vars=['Ejecutados', 'Proyectados'], var_name='Medida', value_name='Monto')
 
-    # Configurar las posiciones y ancho de las barras
-    bar_width = 0.35
-    index = np.arange(len(grouped_data['Pais']))
-
-    # Iniciar la creación del gráfico
-    fig, ax = plt.subplots()
+    bars = alt.Chart(long_df).mark_bar().encode(
+        x=alt.X('Pais:N', title='País', axis=alt.Axis(labelAngle=-45)),
+        xOffset=alt.XOffset('Medida:N', sort=['Ejecutados', 'Proyectados']),
+        y=alt.Y('Monto:Q', title='Monto (en millones)'),
+        color=alt.Color('Medida:N', sort=['Ejecutados', 'Proyectados'],
+                        scale=alt.Scale(domain=['Ejecutados', 'Proyectados'], range=['red', 'blue'])),
+        tooltip=['Pais', 'Medida', alt.Tooltip('Monto:Q', format='.1f')]
+    ).properties(
+        title='Ejecutados y Proyectados por País',
+        width=600,
+        height=400
+    )
 
-    # Crear las barras para 'Ejecutados'
-    bars1 = ax.bar(index - bar_width/2, grouped_data['Ejecutados'], bar_width, label='Ejecutados', color='r')
+    # Añadir las etiquetas de los datos en las barras
+    text = bars.mark_text(baseline='bottom', dy=-3).encode(text=alt.Text('Monto:Q', format='.1f'))
 
-    # Crear las barras para 'Proyectados'
-    bars2 = ax.bar(index + bar_width/2, grouped_data['Proyectados'], bar_width, label='Proyectados', color='b')
+    return bars + text
 
-    # Añadir las etiquetas de los datos en las barras
-    ax.bar_label(bars1, padding=3, fmt='%.1f')
-    ax.bar_label(bars2, padding=3, fmt='%.1f')
 
-    # Ajustar las etiquetas y títulos
-    ax.set_xlabel('País')
-    ax.set_ylabel('Monto (en millones)')
-    ax.set_title('Ejecutados y Proyectados por País')
-    ax.set_xticks(index)
-    ax.set_xticklabels(grouped_data['Pais'], rotation=45)
-    ax.legend()
+def create_comparison_bar_chart(cube, year):
+    # Totales por 'Pais' del año seleccionado, ya redondeados a un decimal en el cubo
+    _, by_country = cube
+    grouped_data = _year_slice(by_country, year).reset_index()
 
-    # Ajuste final para asegurar que la disposición de las etiquetas sea legible
-    fig.tight_layout()
+    # El gráfico se reutiliza mientras el agregado no cambie
+    chart = _chart_cache.get_or_compute(result_fingerprint(grouped_data), lambda: comparison_bar_chart(grouped_data))
 
     # Mostrar el gráfico en Streamlit
-    st.pyplot(fig)
+    st.altair_chart(chart, use_container_width=True)
 
 # Función principal de la aplicación Streamlit
 def main():
@@ -161,14 +280,8 @@ def main():
     # Filtrar por Pais con selección múltiple
     selected_countries = st.multiselect("Selecciona país(es)", ["Todos"] + data['Pais'].unique().tolist())
 
-    if "Todos" in selected_countries:
-        filtered_data = data
-    else:
-        # Filtrar por países seleccionados
-        filtered_data = data[data['Pais'].isin(selected_countries)]
-
-    # Convertir los valores de año a enteros y obtener la lista ordenada
-    unique_years_filtered = sorted(filtered_data['Year'].astype(int).unique())
+    # Datos, años y proyectos de los países seleccionados
+    _, unique_years_filtered, projects = select_countries(data, selected_countries)
 
     # Asegurarse de que haya años disponibles
     if unique_years_filtered:
@@ -180,16 +293,13 @@ def main():
 
 
     # Filtrar por IDOperacion después de obtener los datos mensuales
-    selected_project = st.selectbox("Selecciona proyecto", ["Todos"] + filtered_data['IDOperacion'].unique().tolist())
+    selected_project = st.selectbox("Selecciona proyecto", ["Todos"] + projects)
 
-    if selected_project == "Todos":
-        filtered_data = filtered_data
-    else:
-        # Filtrar por IDOperacion
-        filtered_data = filtered_data[filtered_data['IDOperacion'] == selected_project]
+    # Cubo de todos los años para la selección: cambiar de año sólo lo recorta
+    cube = monthly_cube(data, selected_countries, selected_project)
 
     # Obtener datos mensuales para el año seleccionado
-    monthly_data = get_monthly_data(filtered_data, year)
+    monthly_data = get_monthly_data(cube, year)
 
     # Mostrar los datos en Streamlit
     st.write(f"Desembolsos Mensuales para {year} - País(es) seleccionado(s): {', '.join(selected_countries)} - Proyecto seleccionado: {selected_project}")
@@ -199,7 +309,9 @@ def main():
     chart = create_line_chart_with_labels(monthly_data)
     st.altair_chart(chart, use_container_width=True)
 
-    create_comparison_bar_chart(filtered_data, year)
+    create_comparison_bar_chart(cube, year)
+
+    sidebar_panel()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
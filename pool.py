@@ -0,0 +1,148 @@
+"""Pool de hilos compartido por las sesiones para los cálculos pesados.
+
+Parseo de libros, curvas y exportaciones se ejecutan aquí con concurrencia
+acotada (DESEMBOLSOS_COMPUTE_WORKERS). Las peticiones idénticas que llegan
+mientras un cálculo está en curso no lo repiten: esperan ese mismo resultado.
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from streamlit.logger import get_logger
+
+import cache
+import instrument
+
+LOGGER = get_logger(__name__)
+
+WORKERS = int(os.environ.get("DESEMBOLSOS_COMPUTE_WORKERS", str(min(os.cpu_count() or 1, 4))))
+
+
+class _Flight:
+    """Un cálculo pendiente o en curso y quienes esperan su resultado."""
+
+    def __init__(self, fn, session):
+        self.fn = fn
+        self.session = session
+        self.future = Future()
+        self.claimed = False
+        self.records = []
+
+
+class WorkerPool:
+    """Pool acotado con single-flight por clave."""
+
+    def __init__(self, workers=WORKERS):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="calculo")
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counts = {"enviados": 0, "coalescidos": 0, "completados": 0, "fallidos": 0, "max_en_espera": 0}
+        self._queued = 0
+        self._running = 0
+
+    def _join(self, key, fn):
+        """Cálculo en curso para `key`, creándolo si no existe; indica si lo creó esta llamada."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self._counts["coalescidos"] += 1
+                return flight, False
+            flight = self._flights[key] = _Flight(fn, cache.current_session())
+            self._counts["enviados"] += 1
+            self._queued += 1
+            self._counts["max_en_espera"] = max(self._counts["max_en_espera"], self._queued)
+            queued = self._queued
+        if queued > self.workers:
+            LOGGER.info("%d cálculos en espera para %d hilos", queued, self.workers)
+        return flight, True
+
+    def submit(self, key, fn):
+        """Encola `fn()` sin esperarlo; devuelve el Future compartido por las peticiones de `key`."""
+        flight, owner = self._join(key, fn)
+        if owner:
+            self._executor.submit(self._work, key, flight)
+        return flight.future
+
+    def run(self, key, fn):
+        """Resultado de `fn()`, calculado una sola vez entre las peticiones simultáneas por `key`."""
+        flight, owner = self._join(key, fn)
+        if getattr(self._local, "worker", False):
+            # Desde un hilo del pool no se encola: se ejecuta aquí mismo (o se
+            # toma el cálculo aún no iniciado), así un pool lleno no se bloquea
+            # esperando sus propias subtareas
+            self._execute(key, flight)
+        elif owner:
+            self._executor.submit(self._work, key, flight)
+        result = flight.future.result()
+        if owner:
+            instrument.adopt(flight.records)
+        return result
+
+    def _work(self, key, flight):
+        self._local.worker = True
+        self._execute(key, flight)
+
+    def _execute(self, key, flight):
+        with self._lock:
+            if flight.claimed:
+                return
+            flight.claimed = True
+            self._queued -= 1
+            self._running += 1
+        error = None
+        with cache.on_behalf_of(flight.session), instrument.captured() as records:
+            try:
+                result = flight.fn()
+            except BaseException as exc:
+                error = exc
+        flight.records = records
+        with self._lock:
+            del self._flights[key]
+            self._running -= 1
+            self._counts["fallidos" if error else "completados"] += 1
+        if error is None:
+            flight.future.set_result(result)
+        else:
+            flight.future.set_exception(error)
+
+    def metrics(self):
+        """Hilos, cálculos en espera y en curso, y contadores acumulados."""
+        with self._lock:
+            return {"hilos": self.workers, "en_espera": self._queued, "en_curso": self._running, **self._counts}
+
+
+POOL = WorkerPool()
+
+
+def cached(store, key, compute):
+    """`store[key]`, o compute() en el pool si no está, guardándolo en `store` (un LRUCache)."""
+    value = store.get(key)
+    if value is not None:
+        return value
+
+    def fill():
+        # Otra petición pudo completar el cálculo mientras esta esperaba turno
+        value = store.get(key)
+        if value is None:
+            value = compute()
+            store.put(key, value)
+        return value
+
+    return POOL.run((store.name, key), fill)
+
+
+def run(key, fn):
+    """Resultado de `fn()` calculado en el pool, una sola vez entre las peticiones por `key`."""
+    return POOL.run(key, fn)
+
+
+def submit(key, fn):
+    """Calcula `fn()` en segundo plano en el pool compartido."""
+    return POOL.submit(key, fn)
+
+
+def metrics():
+    """Métricas del pool compartido."""
+    return POOL.metrics()
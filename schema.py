@@ -0,0 +1,159 @@
+"""Esquema de ingesta de las hojas 'Desembolsos' y 'Operaciones'.
+
+Declara tipos de columna, formatos de fecha aceptados, referencias entre hojas y
+las columnas de período derivadas. Los valores que no cumplen el esquema se
+informan: las filas sin una columna de REQUIRED válida o sin operación se
+excluyen, y en las demás columnas el valor inválido se toma como vacío (NaN).
+"""
+import datetime as dt
+import numbers
+
+import numpy as np
+import pandas as pd
+
+# Columnas que usan las páginas de curvas. Todas declaran el mismo conjunto para
+# que una hoja leída por una página sirva a las demás desde la caché
+CURVE_COLUMNS = {
+    'Desembolsos': {'IDEtapa': 'object', 'IDDesembolso': 'object', 'FechaEfectiva': 'date', 'Monto': 'float'},
+    'Operaciones': {'IDEtapa': 'object', 'FechaVigencia': 'date', 'SECTOR': 'object', 'AporteFonplata': 'float'},
+}
+
+# Formatos de las fechas escritas como texto, en orden de prueba (día primero). El
+# texto que no cumple ninguno se interpreta como antes, con día primero (dayfirst)
+DATE_FORMATS = ('%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y', '%d/%m/%Y %H:%M:%S', '%Y-%m-%d', '%Y-%m-%d %H:%M:%S')
+# Origen de los números de serie de fecha de Excel
+EXCEL_EPOCH = pd.Timestamp('1899-12-30')
+
+# Versión de las reglas de coerce_sheets, REQUIRED y REFERENCES. Forma parte de la
+# clave de los snapshots: al cambiar las reglas se incrementa y no se sirven los anteriores
+SCHEMA_VERSION = 2
+
+# Columnas sin las cuales una fila no puede ubicarse en la curva
+REQUIRED = {'Desembolsos': ('FechaEfectiva',), 'Operaciones': ('FechaVigencia',)}
+# Cada desembolso debe pertenecer a una operación válida
+REFERENCES = {'Desembolsos': ('IDEtapa', 'Operaciones')}
+
+# Períodos transcurridos desde la vigencia: días por unidad
+PERIODS = {'Ano': 366, 'Meses': 30}
+
+INVALID_COLUMNS = ['Hoja', 'IDEtapa', 'IDDesembolso', 'Columna', 'Valor', 'Motivo']
+
+
+def _parse_unique_dates(uniques, formats):
+    parsed = pd.Series(pd.NaT, index=range(len(uniques)), dtype='datetime64[us]')
+    kinds = pd.Series([
+        'date' if isinstance(value, (dt.date, np.datetime64)) else
+        'number' if isinstance(value, numbers.Real) and not isinstance(value, bool) else
+        'text' if isinstance(value, str) else 'other'
+        for value in uniques
+    ])
+
+    dates = kinds == 'date'
+    parsed[dates] = pd.to_datetime(pd.Series(uniques[dates.to_numpy()]), errors='coerce').to_numpy()
+    serials = kinds == 'number'
+    parsed[serials] = (EXCEL_EPOCH + pd.to_timedelta(pd.Series(uniques[serials.to_numpy()], dtype=float), unit='D')).to_numpy()
+
+    text = pd.Series(uniques[(kinds == 'text').to_numpy()], index=kinds.index[kinds == 'text'], dtype=object).str.strip()
+    for fmt in formats:
+        pending = text[parsed[text.index].isna()]
+        if pending.empty:
+            break
+        parsed[pending.index] = pd.to_datetime(pending, format=fmt, errors='coerce').to_numpy()
+    pending = text[parsed[text.index].isna()]
+    if not pending.empty:
+        parsed[pending.index] = pd.to_datetime(pending, format='mixed', dayfirst=True, errors='coerce').to_numpy()
+    return parsed
+
+
+def coerce_dates(values, formats=DATE_FORMATS):
+    """Convierte `values` a datetime64 y devuelve (fechas, máscara de valores inválidos).
+
+    Cada valor distinto se interpreta una sola vez: fechas reales, números de serie
+    de Excel o texto en alguno de `formats` (o, si no, con día primero). Los vacíos
+    quedan como NaT sin ser inválidos.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values, pd.Series(False, index=values.index)
+
+    codes, uniques = pd.factorize(values, use_na_sentinel=True)
+    parsed = _parse_unique_dates(np.asarray(uniques, dtype=object), formats).to_numpy()
+    dates = np.where(codes >= 0, parsed[np.maximum(codes, 0)], np.datetime64('NaT'))
+    dates = pd.Series(dates, index=values.index, dtype='datetime64[us]')
+    return dates, pd.Series((codes >= 0) & dates.isna().to_numpy(), index=values.index)
+
+
+def coerce_floats(values):
+    """Convierte `values` a float64 y devuelve (números, máscara de valores inválidos)."""
+    values = pd.Series(values)
+    if pd.api.types.is_float_dtype(values):
+        return values, pd.Series(False, index=values.index)
+    parsed = pd.to_numeric(values, errors='coerce').astype('float64')
+    return parsed, values.notna() & parsed.isna()
+
+
+_COERCERS = {'date': coerce_dates, 'float': coerce_floats}
+
+
+def _invalid_frame(sheet, frame, column, mask, reason):
+    rows = frame[mask]
+    return pd.DataFrame({
+        'Hoja': sheet,
+        'IDEtapa': rows['IDEtapa'].astype(str) if 'IDEtapa' in rows else None,
+        'IDDesembolso': rows['IDDesembolso'].astype(str) if 'IDDesembolso' in rows else None,
+        'Columna': column,
+        'Valor': rows[column].astype(object).where(rows[column].notna(), '').astype(str),
+        'Motivo': reason,
+    }, columns=INVALID_COLUMNS)
+
+
+def coerce_sheets(sheets, columns=CURVE_COLUMNS):
+    """Aplica el esquema a las hojas leídas, en el orden de `columns`.
+
+    Devuelve las hojas tipadas, seguidas de un DataFrame con los valores inválidos
+    (hoja, identificadores, columna, valor original y motivo). Sólo se excluyen las
+    filas con una columna de REQUIRED inválida o vacía y las que no tienen operación;
+    un valor inválido en otra columna queda vacío sin quitar la fila de las curvas
+    que no la usan.
+    """
+    typed = {}
+    invalid = []
+    for (sheet, kinds), frame in zip(columns.items(), sheets):
+        frame = frame.copy()
+        rejected = pd.Series(False, index=frame.index)
+        required = REQUIRED.get(sheet, ())
+        for column, kind in kinds.items():
+            if kind not in _COERCERS:
+                continue
+            coerced, mask = _COERCERS[kind](frame[column])
+            if mask.any():
+                reason = f"no es un valor de tipo {kind}" + ("" if column in required else "; se toma como vacío")
+                invalid.append(_invalid_frame(sheet, frame, column, mask, reason))
+            frame[column] = coerced
+            if column in required:
+                rejected |= mask
+        for column in required:
+            empty = frame[column].isna() & ~rejected
+            if empty.any():
+                invalid.append(_invalid_frame(sheet, frame, column, empty, "vacío"))
+                rejected |= empty
+        typed[sheet] = frame[~rejected].reset_index(drop=True)
+
+    for sheet, (column, target) in REFERENCES.items():
+        if sheet in typed and target in typed:
+            frame = typed[sheet]
+            orphan = ~frame[column].isin(typed[target][column])
+            if orphan.any():
+                invalid.append(_invalid_frame(sheet, frame, column, orphan, f"sin fila válida en '{target}'"))
+                typed[sheet] = frame[~orphan].reset_index(drop=True)
+
+    invalid = pd.concat(invalid, ignore_index=True) if invalid else pd.DataFrame(columns=INVALID_COLUMNS, dtype=object)
+    return (*typed.values(), invalid)
+
+
+def add_periods(frame, start='FechaVigencia', end='FechaEfectiva'):
+    """Agrega las columnas de PERIODS ('Ano', 'Meses') entre `start` y `end`."""
+    days = (frame[end] - frame[start]).dt.days
+    for name, length in PERIODS.items():
+        frame[name] = (days / length).astype(int)
+    return frame
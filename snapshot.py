@@ -0,0 +1,121 @@
+import os
+import tempfile
+
+from streamlit.logger import get_logger
+
+LOGGER = get_logger(__name__)
+
+# Directorio de snapshots columnares (Arrow IPC) de los libros ya parseados
+SNAPSHOT_DIR = os.environ.get("DESEMBOLSOS_SNAPSHOT_DIR", os.path.join(tempfile.gettempdir(), "desembolsos-snapshots"))
+# Cantidad de snapshots que se conservan; se eliminan los de uso menos reciente
+SNAPSHOT_KEEP = int(os.environ.get("DESEMBOLSOS_SNAPSHOT_KEEP", "64"))
+
+
+def _path(key, sheet_name, extension="arrow"):
+    return os.path.join(SNAPSHOT_DIR, f"{key}-{sheet_name}.{extension}")
+
+
+def paths(key, sheet_names):
+    """Rutas de los archivos Arrow del snapshot `key`, o None si falta alguno."""
+    found = [_path(key, name) for name in sheet_names]
+    return found if all(os.path.exists(path) for path in found) else None
+
+
+def parquet_paths(key, sheet_names):
+    """Rutas de una copia Parquet del snapshot `key`, creándola si falta; None si no hay snapshot.
+
+    La copia se escribe lote a lote desde el archivo Arrow mapeado en memoria, para
+    motores que leen Parquet de forma nativa y por bloques (DuckDB).
+    """
+    sources = paths(key, sheet_names)
+    if sources is None:
+        return None
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    found = []
+    try:
+        for name, source in zip(sheet_names, sources):
+            target = _path(key, name, "parquet")
+            if not os.path.exists(target):
+                reader = pa.ipc.open_file(pa.memory_map(source))
+                fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".tmp")
+                with os.fdopen(fd, "wb") as sink, pq.ParquetWriter(sink, reader.schema) as writer:
+                    for i in range(reader.num_record_batches):
+                        writer.write_batch(reader.get_batch(i))
+                os.replace(tmp_path, target)
+            os.utime(target)
+            found.append(target)
+    except (OSError, pa.ArrowInvalid) as exc:
+        LOGGER.warning("No se pudo escribir la copia Parquet del snapshot %s: %s", key, exc)
+        return None
+    return found
+
+
+def load(key, sheet_names, columns=None):
+    """Lee las hojas del snapshot `key` mapeando los archivos en memoria, o None si no existe.
+
+    Con `columns` sólo se convierten a pandas esas columnas de cada hoja.
+    """
+    files = paths(key, sheet_names)
+    if files is None:
+        return None
+
+    import pyarrow as pa
+
+    frames = []
+    try:
+        for path in files:
+            # Sin compresión, las columnas numéricas sin nulos se leen sin copia
+            # desde el page cache, compartido por todos los procesos del servidor
+            table = pa.ipc.open_file(pa.memory_map(path)).read_all()
+            if columns is not None:
+                table = table.select(columns)
+            frames.append(table.to_pandas(split_blocks=True))
+            os.utime(path)
+    except (OSError, pa.ArrowInvalid, KeyError) as exc:
+        LOGGER.warning("Snapshot %s ilegible, se vuelve a parsear: %s", key, exc)
+        return None
+    return tuple(frames)
+
+
+def save(key, sheet_names, frames):
+    """Persiste las hojas parseadas; si alguna no es representable en Arrow no se guarda nada."""
+    import pyarrow as pa
+
+    try:
+        tables = [pa.Table.from_pandas(df, preserve_index=False) for df in frames]
+    except (pa.ArrowInvalid, pa.ArrowTypeError) as exc:
+        LOGGER.info("Snapshot %s omitido: %s", key, exc)
+        return
+
+    try:
+        os.makedirs(SNAPSHOT_DIR, exist_ok=True)
+        for name, table in zip(sheet_names, tables):
+            # Escribir en un temporal y renombrar: otros procesos nunca ven archivos a medias
+            fd, tmp_path = tempfile.mkstemp(dir=SNAPSHOT_DIR, suffix=".tmp")
+            with os.fdopen(fd, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+            os.replace(tmp_path, _path(key, name))
+    except OSError as exc:
+        LOGGER.warning("No se pudo escribir el snapshot %s: %s", key, exc)
+        return
+    _prune()
+
+
+def _prune():
+    try:
+        entries = [entry for entry in os.scandir(SNAPSHOT_DIR) if entry.name.endswith((".arrow", ".parquet"))]
+    except OSError:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    ranks = {}
+    for entry in entries:
+        key = entry.name.split("-", 1)[0]
+        ranks.setdefault(key, len(ranks))
+        if ranks[key] >= SNAPSHOT_KEEP:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
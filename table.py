@@ -0,0 +1,84 @@
+import math
+import weakref
+
+import streamlit as st
+
+from cache import LRUCache, nbytes
+from instrument import stage
+
+# Filas por página que se ofrecen; sólo la página visible se envía al navegador
+PAGE_SIZES = (25, 50, 100, 500)
+NO_SORT = '(sin orden)'
+
+# Vistas ordenadas y filtradas de las tablas completas, compartidas entre sesiones.
+# Cada entrada guarda (referencia débil a la tabla original, vista o None si la vista
+# es la tabla misma): la tabla que desaloja otra caché no sigue viva por estar aquí
+_views = LRUCache(max_entries=16, name="vistas", sizeof=lambda entry: nbytes(entry[1]) if entry[1] is not None else 0)
+
+
+def table_view(df, sort_column=None, descending=False, filter_column=None, filter_text=''):
+    """`df` filtrado por texto en `filter_column` y ordenado por `sort_column`.
+
+    La vista se cachea por tabla y criterio: paginar no vuelve a ordenar ni a filtrar.
+    """
+    key = (id(df), sort_column, descending, filter_column, filter_text)
+    cached = _views.get(key)
+    # Si la tabla original ya no existe, ese id puede ser ahora otra tabla: se recalcula
+    if cached is not None and cached[0]() is df:
+        return df if cached[1] is None else cached[1]
+
+    view = df
+    if filter_column is not None and filter_text:
+        values = view[filter_column].astype(str)
+        view = view[values.str.contains(filter_text, case=False, regex=False, na=False)]
+    if sort_column is not None:
+        view = view.sort_values(sort_column, ascending=not descending, kind='stable')
+    _views.put(key, (weakref.ref(df), None if view is df else view))
+    return view
+
+
+@st.fragment
+def paged_table(df, key):
+    """Tabla paginada de `df`: ordenar, filtrar y paginar se resuelve en el servidor.
+
+    Sólo la página visible se serializa, y cambiar de página o de criterio
+    vuelve a ejecutar este fragmento, no la página completa.
+    """
+    columns = [str(column) for column in df.columns]
+    filter_col, text_col, sort_col, order_col = st.columns([2, 3, 2, 1])
+    filter_column = filter_col.selectbox('Filtrar por', columns, key=f'{key}_filtro_columna')
+    filter_text = text_col.text_input('Contiene', key=f'{key}_filtro_texto').strip()
+    sort_column = sort_col.selectbox('Ordenar por', [NO_SORT] + columns, key=f'{key}_orden')
+    descending = order_col.toggle('Desc.', key=f'{key}_descendente')
+
+    with stage('orden y filtro', filas=len(df)):
+        view = table_view(
+            df,
+            sort_column=None if sort_column == NO_SORT else df.columns[columns.index(sort_column)],
+            descending=descending,
+            filter_column=df.columns[columns.index(filter_column)] if columns else None,
+            filter_text=filter_text,
+        )
+
+    size_col, page_col, info_col = st.columns([1, 1, 3])
+    page_size = size_col.selectbox('Filas por página', PAGE_SIZES, index=1, key=f'{key}_tamano')
+    pages = max(math.ceil(len(view) / page_size), 1)
+    page = page_col.number_input('Página', min_value=1, max_value=pages, value=1, key=f'{key}_pagina')
+    start = (page - 1) * page_size
+    stop = min(start + page_size, len(view))
+    info_col.caption(f"Filas {start + 1 if len(view) else 0}–{stop} de {len(view)} ({len(df)} en total)")
+
+    with stage('tabla', filas=stop - start):
+        st.dataframe(view.iloc[start:stop])
+
+
+def invalid_rows_notice(invalid, key):
+    """Aviso con los valores del libro que no cumplen el esquema de ingesta."""
+    if not len(invalid):
+        return
+    st.warning(
+        f"{len(invalid)} valores del libro son inválidos. Las filas sin fecha válida o sin operación "
+        "no se incluyen en los cálculos; los demás valores inválidos se toman como vacíos."
+    )
+    with st.expander("Ver valores inválidos"):
+        paged_table(invalid, key=f'{key}_invalidas')
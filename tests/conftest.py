@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Los módulos de la app están en la raíz del repositorio, como al correr `streamlit run`
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
@@ -0,0 +1,17 @@
+import subprocess
+import sys
+
+from conftest import ROOT
+
+
+def test_startup_benchmark_renders_every_page():
+    """El benchmark de arranque importa y dibuja cada página sin errores."""
+    from benchmarks.startup import PAGES
+
+    result = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.startup', '--projects', '20', '--disbursements', '200', '--repeat', '1'],
+        cwd=ROOT, capture_output=True, text=True, timeout=900,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    rendered = [line.split()[0] for line in result.stdout.splitlines()[1:]]
+    assert rendered == list(PAGES)
@@ -0,0 +1,53 @@
+from cache import LRUCache, MemoryGovernor, on_behalf_of
+
+
+def caches(governor, count=2):
+    return [LRUCache(name=f'c{i}', sizeof=len, governor=governor) for i in range(count)]
+
+
+def test_total_budget_evicts_least_recently_used_entries_of_any_cache():
+    governor = MemoryGovernor(budget=100, session_budget=0)
+    first, second = caches(governor)
+    first.put('a', b'x' * 40)
+    second.put('b', b'x' * 40)
+    first.get('a')
+
+    second.put('c', b'x' * 40)
+
+    assert 'a' in first and 'b' not in second and 'c' in second
+    assert governor.usage()['total'] == 80
+
+
+def test_session_budget_only_evicts_that_sessions_entries():
+    governor = MemoryGovernor(budget=0, session_budget=100)
+    (store,) = caches(governor, 1)
+    with on_behalf_of('s1'):
+        store.put('s1-a', b'x' * 40)
+    with on_behalf_of('s2'):
+        store.put('s2-a', b'x' * 40)
+        store.put('s2-b', b'x' * 40)
+        store.put('s2-c', b'x' * 40)
+
+    assert 's1-a' in store and 's2-a' not in store and 's2-b' in store and 's2-c' in store
+    assert governor.usage()['sessions'] == {'s1': 40, 's2': 80}
+
+
+def test_oversized_entry_is_not_cached_and_evicts_nothing(caplog):
+    governor = MemoryGovernor(budget=100, session_budget=0, max_share=0.5)
+    first, second = caches(governor)
+    first.put('a', b'x' * 30)
+    second.put('grande', b'x' * 20)
+
+    second.put('grande', b'x' * 60)
+
+    assert 'a' in first and 'grande' not in second
+    assert governor.usage()['total'] == 30
+    assert second.get_or_compute('grande', lambda: b'y' * 60) == b'y' * 60
+    assert 'demasiado grande' in caplog.text
+
+
+def test_session_budget_also_limits_entry_size():
+    governor = MemoryGovernor(budget=1000, session_budget=100, max_share=0.5)
+
+    assert governor.admits(50) and not governor.admits(51)
+    assert MemoryGovernor(budget=0, session_budget=0).admits(10 ** 12)
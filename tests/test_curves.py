@@ -0,0 +1,101 @@
+import io
+import os
+import runpy
+
+import pandas as pd
+import pytest
+
+import engine
+import snapshot
+import workbook
+from benchmarks.synthetic import make_workbook
+from schema import coerce_sheets
+from conftest import ROOT
+
+# Página: (función de la página, agrupación, denominador)
+PAGES = {
+    'Hello.py': ('process_dataframe', 'IDEtapa', None),
+    'pages/Curva_Operaciones.py': ('process_dataframe', 'IDEtapa', 'AporteFonplata'),
+    'pages/Curva_Paises.py': ('process_dataframe', 'Pais', None),
+    'pages/Paises.py': ('process_dataframe', 'Pais', None),
+    'pages/Pie.py': ('process_dataframe', 'IDEtapa', 'AporteFonplata'),
+    'pages/Sectores.py': ('process_dataframe_for_sector', 'SECTOR', None),
+}
+COUNTRY_MAP = {'AR': 'Argentina', 'BO': 'Bolivia', 'BR': 'Brasil', 'PY': 'Paraguay', 'UR': 'Uruguay'}
+
+
+@pytest.fixture(scope='module')
+def workbook_data(tmp_path_factory):
+    path = make_workbook(str(tmp_path_factory.mktemp('libro') / 'libro.xlsx'), projects=60, disbursements=900)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.fixture(autouse=True)
+def snapshot_dir(tmp_path, monkeypatch):
+    # Sin hojas en caché cada prueba escribe (y DuckDB lee) sus propios snapshots
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    workbook._sheets.clear()
+
+
+def baseline_curves(data, key, denominator):
+    """Curva como la calculaba cada página antes del motor común (merge, apply por grupo)."""
+    desembolsos = pd.read_excel(io.BytesIO(data), sheet_name='Desembolsos')
+    operaciones = pd.read_excel(io.BytesIO(data), sheet_name='Operaciones')
+    columns = ['IDEtapa', 'FechaVigencia'] + [c for c in (key, denominator) if c not in (None, 'IDEtapa', 'Pais')]
+    merged_df = pd.merge(desembolsos, operaciones[columns], on='IDEtapa', how='left')
+    merged_df['FechaEfectiva'] = pd.to_datetime(merged_df['FechaEfectiva'], dayfirst=True)
+    merged_df['FechaVigencia'] = pd.to_datetime(merged_df['FechaVigencia'], dayfirst=True)
+    merged_df['Ano'] = ((merged_df['FechaEfectiva'] - merged_df['FechaVigencia']).dt.days / 366).astype(int)
+    merged_df['Meses'] = ((merged_df['FechaEfectiva'] - merged_df['FechaVigencia']).dt.days / 30).astype(int)
+    if key == 'Pais':
+        merged_df['Pais'] = merged_df['IDEtapa'].str[:2].map(COUNTRY_MAP).fillna('Desconocido')
+
+    keys = [key, 'Ano', 'Meses', 'IDDesembolso'] + ([denominator] if denominator else [])
+    result_df = merged_df.groupby(keys)['Monto'].sum().reset_index()
+    result_df['Monto Acumulado'] = result_df.groupby([key])['Monto'].cumsum().reset_index(drop=True)
+    if denominator is None:
+        result_df['Porcentaje del Monto'] = result_df.groupby([key])['Monto'].apply(lambda x: x / x.sum() * 100).reset_index(drop=True)
+        result_df['Porcentaje del Monto Acumulado'] = result_df.groupby([key])['Monto Acumulado'].apply(lambda x: x / x.max() * 100).reset_index(drop=True)
+    else:
+        result_df['Porcentaje del Monto'] = result_df['Monto'] / result_df[denominator] * 100
+        result_df['Porcentaje del Monto Acumulado'] = result_df['Monto Acumulado'] / result_df[denominator] * 100
+    if key == 'IDEtapa':
+        result_df['Pais'] = result_df['IDEtapa'].str[:2].map(COUNTRY_MAP).fillna('Desconocido')
+    return result_df
+
+
+@pytest.mark.parametrize('backend', ['pandas', 'duckdb'])
+@pytest.mark.parametrize('page', list(PAGES))
+def test_page_curves_match_baseline(page, backend, workbook_data, monkeypatch):
+    function, key, denominator = PAGES[page]
+    if backend == 'duckdb':
+        pytest.importorskip('duckdb')
+        assert engine._duckdb_curves(io.BytesIO(workbook_data), key, denominator) is not None
+    monkeypatch.setattr(engine, 'BACKEND', backend)
+    module = runpy.run_path(os.path.join(ROOT, page), run_name='test')
+
+    result_df = module[function](io.BytesIO(workbook_data))
+
+    pd.testing.assert_frame_equal(
+        result_df, baseline_curves(workbook_data, key, denominator),
+        check_dtype=False, check_exact=False, rtol=1e-9,
+    )
+    pd.testing.assert_frame_equal(result_df, engine.workbook_curves(io.BytesIO(workbook_data), key, denominator), check_dtype=False)
+
+
+def test_duckdb_backend_does_not_keep_the_sheets_in_memory(workbook_data, monkeypatch):
+    pytest.importorskip('duckdb')
+    monkeypatch.setattr(engine, 'BACKEND', 'duckdb')
+    workbook._results.clear()
+    xls_path = io.BytesIO(workbook_data)
+
+    curves = engine.workbook_curves(xls_path, 'Pais')
+    invalid = workbook.invalid_rows(xls_path)
+    envelopes = engine.envelopes(xls_path, 'sector')
+
+    assert len(workbook._sheets) == 0
+    desembolsos, operaciones, expected_invalid = coerce_sheets(workbook.read_sheets(workbook_data, workbook.CURVE_COLUMNS))
+    pd.testing.assert_frame_equal(curves, engine.disbursement_curves(desembolsos, operaciones, 'Pais'))
+    pd.testing.assert_frame_equal(invalid, expected_invalid, check_dtype=False)
+    assert not envelopes.empty
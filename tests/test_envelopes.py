@@ -0,0 +1,89 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from curves import _nanpercentiles, project_envelopes
+
+MEASURES = ['p10', 'p50', 'p90', 'Promedio', 'Proyectos']
+
+
+def project_cube(rows):
+    """Cubo anual por ('IDEtapa', 'Ano') con las dos medidas de las envolventes."""
+    index = pd.MultiIndex.from_tuples([(project, year) for project, year, _ in rows], names=['IDEtapa', 'Ano'])
+    values = [value for *_, value in rows]
+    return pd.DataFrame({'Monto Acumulado': values, 'Porcentaje del Monto Acumulado': values}, index=index)
+
+
+def reference_envelopes(cube, groups, measure):
+    """Envolventes calculadas grupo por grupo y año por año con np.percentile."""
+    data = cube[[measure]].reset_index()
+    data['Grupo'] = data['IDEtapa'].map(groups)
+    data = data.dropna(subset=['Grupo'])
+    years = range(data['Ano'].min(), data['Ano'].max() + 1)
+    rows = []
+    for group, projects in data.groupby('Grupo'):
+        curves = {}
+        for project, values in projects.groupby('IDEtapa'):
+            values = values.set_index('Ano')[measure]
+            curve = values.reindex(range(values.index.min(), values.index.max() + 1)).ffill().reindex(years)
+            curve[[year for year in years if year < values.index.min()]] = 0.0
+            curves[project] = curve
+        curves = pd.DataFrame(curves)
+        for year in years:
+            values = curves.loc[year].dropna()
+            if len(values):
+                rows.append((group, year, *np.percentile(values, [10, 50, 90]), values.mean(), len(values)))
+    return pd.DataFrame(rows, columns=['Grupo', 'Ano', *MEASURES])
+
+
+def test_nanpercentiles_match_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(7, 50, 12))
+    values[rng.random(values.shape) < 0.4] = np.nan
+    values[2, :, 3] = np.nan
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        expected = [np.nanpercentile(values, percentile, axis=1) for percentile in (10, 50, 90)]
+
+    for got, want in zip(_nanpercentiles(values, (10, 50, 90), axis=1), expected):
+        np.testing.assert_allclose(got, want, equal_nan=True)
+
+
+def test_curves_carry_forward_start_at_zero_and_end_after_the_last_year():
+    # A-1 desembolsa en 2 y 4; A-2 en 3 y 5
+    cube = project_cube([('A-1', 2, 10.0), ('A-1', 4, 30.0), ('A-2', 3, 20.0), ('A-2', 5, 40.0)])
+    groups = pd.Series({'A-1': 'Vial', 'A-2': 'Vial'}, name='SECTOR')
+
+    envelopes = project_envelopes(cube, groups, measures=['Monto Acumulado'])
+
+    # Año 3: A-1 arrastra 10; año 5: A-1 ya terminó y sólo cuenta A-2
+    assert envelopes['Ano'].tolist() == [2, 3, 4, 5]
+    assert envelopes['Promedio'].tolist() == [5.0, 15.0, 25.0, 40.0]
+    assert envelopes['Proyectos'].tolist() == [2, 2, 2, 1]
+    assert envelopes['p10'].tolist() == pytest.approx([1.0, 11.0, 21.0, 40.0])
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_envelopes_match_a_per_group_reference(seed):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for project in range(300):
+        start = rng.integers(-1, 3)
+        years = sorted(set(rng.integers(start, start + rng.integers(1, 10), size=rng.integers(1, 6))))
+        rows += [(f'AR-{project}', int(year), rng.random() * 100) for year in years]
+    cube = project_cube(rows)
+    projects = cube.index.unique('IDEtapa')
+    # Algunos proyectos sin grupo: quedan fuera de las envolventes
+    groups = pd.Series(rng.choice(['S0', 'S1', 'S2', 'S3', None], size=len(projects)), index=projects, name='SECTOR')
+
+    envelopes = project_envelopes(cube, groups)
+
+    for measure in ('Monto Acumulado', 'Porcentaje del Monto Acumulado'):
+        got = envelopes[envelopes['Medida'] == measure].reset_index(drop=True)
+        want = reference_envelopes(cube, groups, measure)
+        assert got['SECTOR'].tolist() == want['Grupo'].tolist()
+        assert got['Ano'].tolist() == want['Ano'].tolist()
+        np.testing.assert_allclose(got[MEASURES].to_numpy(float), want[MEASURES].to_numpy(float))
@@ -0,0 +1,95 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import fetch
+
+
+class Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(self.headers.get('If-None-Match'))
+        time.sleep(server.delay)
+        if self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', server.etag)
+        self.send_header('Content-Length', str(len(server.body)))
+        self.end_headers()
+        try:
+            self.wfile.write(server.body)
+        except ConnectionError:
+            # El cliente ya se fue por timeout
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.setattr(fetch, 'CACHE_DIR', str(tmp_path / 'descargas'))
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    httpd.requests, httpd.delay, httpd.etag, httpd.body = [], 0, '"v1"', b'a,b\n1,2\n'
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}/datos.csv'
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def wait_for_revalidations():
+    deadline = time.time() + 5
+    while fetch._revalidations and time.time() < deadline:
+        time.sleep(0.01)
+    assert not fetch._revalidations
+
+
+def test_fresh_copy_is_served_without_a_request(server):
+    assert fetch.fetch(server.url, ttl=60) == b'a,b\n1,2\n'
+    assert fetch.fetch(server.url, ttl=60) == b'a,b\n1,2\n'
+
+    assert server.requests == [None]
+
+
+def test_stale_copy_is_revalidated_in_the_background(server):
+    fetch.fetch(server.url, ttl=0)
+
+    assert fetch.fetch(server.url, ttl=0) == b'a,b\n1,2\n'
+    wait_for_revalidations()
+    # 304: el TTL de la copia se renueva sin volver a descargarla
+    assert server.requests == [None, '"v1"']
+    assert fetch.fetch(server.url, ttl=60) == b'a,b\n1,2\n'
+
+    server.etag, server.body = '"v2"', b'a,b\n3,4\n'
+    assert fetch.fetch(server.url, ttl=0) == b'a,b\n1,2\n'
+    wait_for_revalidations()
+    assert fetch.fetch(server.url, ttl=60) == b'a,b\n3,4\n'
+
+
+def test_slow_host_does_not_block_readers_with_a_stale_copy(server):
+    fetch.fetch(server.url, ttl=0)
+    server.delay = 0.5
+
+    started = time.time()
+    assert fetch.fetch(server.url, ttl=0, timeout=0.2) == b'a,b\n1,2\n'
+    assert fetch.fetch(server.url, ttl=0, timeout=0.2) == b'a,b\n1,2\n'
+    assert time.time() - started < 0.2
+    wait_for_revalidations()
+
+    # Tras el timeout la copia se usa un TTL más antes de volver a intentarlo
+    assert len(server.requests) == 2
+    fetch.fetch(server.url, ttl=60, timeout=0.2)
+    assert len(server.requests) == 2
+
+
+def test_slow_host_without_a_copy_raises(server):
+    server.delay = 0.5
+
+    with pytest.raises((TimeoutError, fetch.urllib.error.URLError)):
+        fetch.fetch(server.url, timeout=0.2)
@@ -0,0 +1,20 @@
+import json
+import re
+
+import instrument
+
+
+def test_stage_log_lines_are_parseable(monkeypatch):
+    lines = []
+    monkeypatch.setattr(instrument, 'ENABLED', True)
+    monkeypatch.setattr(instrument.LOGGER, 'info', lines.append)
+
+    with instrument.captured() as records:
+        with instrument.stage('parseo de hojas', bytes=10, clave='a=b "c"'):
+            pass
+
+    (line,) = lines
+    fields = {key: json.loads(value) for key, value in re.findall(r'(\w+)=("(?:[^"\\]|\\.)*"|\S+)', line)}
+    assert fields == records[0]
+    assert fields['etapa'] == 'parseo de hojas'
+    assert fields['clave'] == 'a=b "c"'
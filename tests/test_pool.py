@@ -0,0 +1,75 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from pool import WorkerPool
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline
+        time.sleep(0.01)
+
+
+def run_together(pool, key, fn, release, callers=8):
+    """Lanza `callers` pool.run(key, fn) a la vez y libera `fn` cuando todos se sumaron."""
+    with ThreadPoolExecutor(max_workers=callers) as callers_pool:
+        futures = [callers_pool.submit(pool.run, key, fn) for _ in range(callers)]
+        wait_until(lambda: pool.metrics()['coalescidos'] == callers - 1)
+        release.set()
+    return futures
+
+
+def test_identical_requests_run_once():
+    pool = WorkerPool(workers=2)
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return object()
+
+    futures = run_together(pool, 'clave', slow, release)
+    results = [future.result(timeout=5) for future in futures]
+
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert pool.metrics()['completados'] == 1
+
+
+def test_nested_run_from_a_pool_thread_does_not_deadlock():
+    pool = WorkerPool(workers=1)
+
+    def outer():
+        # Con un solo hilo, encolar la subtarea y esperarla bloquearía el pool
+        return pool.run('interna', lambda: 2) + 1
+
+    results = []
+    caller = threading.Thread(target=lambda: results.append(pool.run('externa', outer)), daemon=True)
+    caller.start()
+    caller.join(5)
+
+    assert results == [3]
+    assert pool.metrics()['completados'] == 2
+
+
+def test_error_reaches_every_waiter():
+    pool = WorkerPool(workers=2)
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise ValueError('libro ilegible')
+
+    futures = run_together(pool, 'clave', failing, release)
+
+    for future in futures:
+        with pytest.raises(ValueError, match='libro ilegible'):
+            future.result(timeout=5)
+    assert pool.metrics()['fallidos'] == 1
+    # Un cálculo fallido no queda registrado: la siguiente petición lo reintenta
+    assert pool.run('clave', lambda: 'ok') == 'ok'
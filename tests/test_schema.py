@@ -0,0 +1,53 @@
+import os
+import runpy
+
+import pandas as pd
+import pytest
+import streamlit as st
+
+from conftest import ROOT
+from curves import disbursement_curves
+from schema import coerce_dates, coerce_sheets
+from test_curves import PAGES
+
+
+def test_text_dates_are_read_day_first_like_before():
+    values = pd.Series(['05/03/21', '5/3/2021', '2021-03-05', '05.03.2021', 'sin fecha', None])
+
+    dates, invalid = coerce_dates(values)
+
+    assert dates[:4].tolist() == [pd.Timestamp('2021-03-05')] * 4
+    assert invalid.tolist() == [False, False, False, False, True, False]
+
+
+def test_invalid_optional_value_keeps_the_operation():
+    desembolsos = pd.DataFrame({'IDEtapa': ['AR-1', 'AR-1', 'BO-2'], 'IDDesembolso': ['D1', 'D2', 'D3'],
+                                'FechaEfectiva': ['01/06/2020', '01/06/2021', '01/06/2020'], 'Monto': [10.0, 'N/D', 5.0]})
+    operaciones = pd.DataFrame({'IDEtapa': ['AR-1', 'BO-2'], 'FechaVigencia': ['01/01/2020', 'sin fecha'],
+                                'SECTOR': ['Vial', 'Salud'], 'AporteFonplata': ['N/D', 100.0]})
+
+    desembolsos, operaciones, invalid = coerce_sheets((desembolsos, operaciones))
+
+    assert desembolsos['IDDesembolso'].tolist() == ['D1', 'D2']
+    assert desembolsos['Monto'].isna().tolist() == [False, True]
+    assert operaciones['IDEtapa'].tolist() == ['AR-1'] and pd.isna(operaciones['AporteFonplata'][0])
+    assert invalid[['Columna', 'Motivo']].values.tolist() == [
+        ['Monto', 'no es un valor de tipo float; se toma como vacío'],
+        ['FechaVigencia', 'no es un valor de tipo date'],
+        ['AporteFonplata', 'no es un valor de tipo float; se toma como vacío'],
+        ['IDEtapa', "sin fila válida en 'Operaciones'"],
+    ]
+    assert disbursement_curves(desembolsos, operaciones, 'IDEtapa')['IDEtapa'].unique().tolist() == ['AR-1']
+
+
+@pytest.mark.parametrize('page', list(PAGES))
+def test_empty_cube_shows_a_notice(page, monkeypatch):
+    messages = []
+    monkeypatch.setattr(st, 'info', messages.append)
+    module = runpy.run_path(os.path.join(ROOT, page), run_name='test')
+    cube = pd.DataFrame(index=pd.MultiIndex.from_arrays([[], []], names=[PAGES[page][1], 'Ano']))
+
+    module['show_selection'].__wrapped__(cube, **module['CHARTS'])
+    module['show_all'](cube, **module['CHARTS'])
+
+    assert len(messages) == 2
@@ -0,0 +1,20 @@
+import gc
+import weakref
+
+import pandas as pd
+import pytest
+
+import table
+
+
+@pytest.mark.parametrize('criteria', [{}, {'sort_column': 'Monto'}, {'filter_column': 'IDEtapa', 'filter_text': 'BO'}])
+def test_views_do_not_keep_the_source_table_alive(criteria):
+    df = pd.DataFrame({'IDEtapa': ['BO-1', 'AR-2', 'BO-3'], 'Monto': [3.0, 1.0, 2.0]})
+    view = table.table_view(df, **criteria)
+    assert table.table_view(df, **criteria) is view
+
+    source = weakref.ref(df)
+    del df, view
+    gc.collect()
+
+    assert source() is None
@@ -0,0 +1,42 @@
+import pytest
+import streamlit as st
+from streamlit.proto.Common_pb2 import FileURLs
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec
+
+import snapshot
+import workbook
+from benchmarks.synthetic import make_workbook
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(workbook, 'get_script_run_ctx', lambda **kwargs: object())
+    monkeypatch.setattr(st, 'session_state', {})
+    workbook._sheets.clear()
+    workbook._results.clear()
+
+
+def test_each_upload_is_hashed_once_per_session(session, tmp_path, monkeypatch):
+    with open(make_workbook(str(tmp_path / 'libro.xlsx'), projects=10, disbursements=50), 'rb') as f:
+        data = f.read()
+    hashed = []
+    fingerprint = workbook.fingerprint
+    monkeypatch.setattr(workbook, 'fingerprint', lambda value: hashed.append(value == data) or fingerprint(value))
+
+    # Cada rerun recibe un UploadedFile nuevo del mismo archivo
+    for _ in range(2):
+        upload = UploadedFile(UploadedFileRec('id-1', 'libro.xlsx', 'application/octet-stream', data), FileURLs())
+        workbook.cached_result(upload, 'filas', lambda path: len(workbook.load_sheets(path, workbook.CURVE_COLUMNS)[0]))
+        workbook.invalid_rows(upload)
+        workbook.snapshot_paths(upload)
+
+    assert hashed.count(True) == 1
+
+
+def test_snapshot_key_changes_with_the_schema_version(monkeypatch):
+    monkeypatch.setattr(workbook, 'workbook_digest', lambda xls_path: 'huella')
+    key = workbook._snapshot_key('libro.xlsx', workbook.CURVE_COLUMNS)
+    monkeypatch.setattr(workbook, 'SCHEMA_VERSION', workbook.SCHEMA_VERSION + 1)
+
+    assert workbook._snapshot_key('libro.xlsx', workbook.CURVE_COLUMNS) != key
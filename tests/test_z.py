@@ -0,0 +1,19 @@
+import os
+import runpy
+
+import pandas as pd
+
+from conftest import ROOT
+
+
+def test_country_totals_do_not_depend_on_row_order():
+    z = runpy.run_path(os.path.join(ROOT, 'pages', 'z.py'), run_name='test')
+    # 0.01 + 0.02 + 0.32 suma 0.35 y 0.32 + 0.02 + 0.01 suma 0.35000000000000003
+    data = pd.DataFrame({'Year': [2023] * 3, 'Pais': ['Bolivia'] * 3, 'Ejecutados': [0.01, 0.02, 0.32], 'Proyectados': [1.05, 0.0, -2.3]})
+
+    totals = [
+        z['exact_totals'](frame, ['Year', 'Pais'], ['Ejecutados', 'Proyectados']).loc[(2023, 'Bolivia')].tolist()
+        for frame in (data, data.iloc[::-1], data.iloc[[1, 0, 2]])
+    ]
+
+    assert totals == [[0.4, -1.3]] * 3
@@ -0,0 +1,36 @@
+import streamlit as st
+
+from engine import precompute
+
+# Libro cargado en la sesión, disponible para todas las páginas
+SESSION_KEY = 'libro'
+
+
+def _forget_removed(widget_key):
+    # El usuario quitó el archivo del cargador: las demás páginas tampoco lo usan
+    if st.session_state.get(widget_key) is None:
+        st.session_state.pop(SESSION_KEY, None)
+
+
+def _upload_id(uploaded_file):
+    return getattr(uploaded_file, 'file_id', id(uploaded_file))
+
+
+def workbook_uploader(curve, label="Carga tu Excel aquí"):
+    """Cargador del libro compartido por las páginas.
+
+    Al cargar un archivo se calculan en segundo plano las curvas de todas las
+    páginas, empezando por `curve` (ver engine.CURVES). Las demás páginas usan
+    el mismo libro sin volver a cargarlo. Devuelve el libro de la sesión o None.
+    """
+    widget_key = f'{curve}_cargador'
+    uploaded_file = st.file_uploader(label, type="xlsx", key=widget_key, on_change=_forget_removed, args=(widget_key,))
+    stored = st.session_state.get(SESSION_KEY)
+    if uploaded_file is not None:
+        if stored is None or _upload_id(stored) != _upload_id(uploaded_file):
+            st.session_state[SESSION_KEY] = uploaded_file
+            precompute(uploaded_file, first=curve)
+        return uploaded_file
+    if stored is not None:
+        st.caption(f"Se usa **{stored.name}**, cargado en otra página. Carga otro archivo para reemplazarlo.")
+    return stored
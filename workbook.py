@@ -0,0 +1,233 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import pandas as pd
+import streamlit as st
+from streamlit.logger import get_logger
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import snapshot
+import xlsx_stream
+from cache import LRUCache
+from instrument import stage
+from pool import WORKERS, cached, run
+from schema import CURVE_COLUMNS, DATE_FORMATS, SCHEMA_VERSION, coerce_sheets
+
+LOGGER = get_logger(__name__)
+
+SHEETS = ('Desembolsos', 'Operaciones')
+# Con columnas declaradas, junto a las hojas se guardan las filas que no cumplen el esquema
+INVALID_ROWS = 'Invalidas'
+# Procesos de parseo, compartidos por todo el servidor: alcanzan para que cada hilo
+# del pool de cálculo parsee las hojas de su libro a la vez, sin esperar a otro libro
+PARSE_WORKERS = int(os.environ.get("DESEMBOLSOS_PARSE_WORKERS", str(WORKERS * len(SHEETS))))
+# Huellas de los archivos subidos en la sesión, por file_id
+DIGESTS_KEY = 'huellas_libros'
+
+# Hojas parseadas y resultados derivados, compartidos por todas las páginas y sesiones
+_sheets = LRUCache(name="hojas")
+_results = LRUCache(name="resultados")
+
+_pool = None
+_pool_guard = threading.Lock()
+
+
+def read_bytes(xls_path):
+    """Devuelve el contenido del archivo subido (o de una ruta) como bytes."""
+    with stage("lectura del archivo"):
+        if hasattr(xls_path, "getvalue"):
+            return xls_path.getvalue()
+        with open(xls_path, "rb") as f:
+            return f.read()
+
+
+def fingerprint(data):
+    """Huella SHA-256 del contenido del libro."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def workbook_digest(xls_path):
+    """Huella del libro, calculada una sola vez por archivo subido.
+
+    Cada rerun recibe un UploadedFile nuevo con el mismo file_id: la huella se
+    guarda en la sesión por file_id, y también en el propio archivo para los
+    hilos del pool, que no tienen sesión. Las rutas se hashean en cada llamada.
+    """
+    file_id = getattr(xls_path, "file_id", None)
+    if file_id is None:
+        return fingerprint(read_bytes(xls_path))
+    digest = getattr(xls_path, "_huella", None)
+    if digest is not None:
+        return digest
+    digests = st.session_state.setdefault(DIGESTS_KEY, {}) if get_script_run_ctx(suppress_warning=True) else {}
+    if file_id not in digests:
+        digests[file_id] = fingerprint(read_bytes(xls_path))
+    xls_path._huella = digests[file_id]
+    return xls_path._huella
+
+
+def _executor():
+    global _pool
+    with _pool_guard:
+        if _pool is None:
+            # 'spawn' evita hacer fork de un servidor con varios hilos activos
+            _pool = ProcessPoolExecutor(max_workers=PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _reset_executor():
+    global _pool
+    with _pool_guard:
+        _pool = None
+
+
+def _parse_sheet(data, sheet_name, columns=None):
+    if columns is None:
+        return pd.read_excel(io.BytesIO(data), sheet_name=sheet_name, engine='openpyxl')
+    return xlsx_stream.read_columns(data, sheet_name, columns[sheet_name])
+
+
+def _parse_sheets(data, columns=None):
+    # Parsear ambas hojas a la vez: la latencia es la de la hoja más lenta
+    try:
+        futures = [_executor().submit(_parse_sheet, data, name, columns) for name in SHEETS]
+        return tuple(future.result() for future in futures)
+    except BrokenProcessPool:
+        LOGGER.warning("El pool de parseo dejó de responder; se parsea en el proceso actual")
+        _reset_executor()
+        return read_sheets(data, columns)
+
+
+def read_sheets(data, columns=None):
+    """Parsea las hojas de `data` en el proceso actual, sin caché, snapshot ni pool."""
+    return tuple(_parse_sheet(data, name, columns) for name in SHEETS)
+
+
+def _snapshot_key(xls_path, columns):
+    key = workbook_digest(xls_path)
+    if columns is not None:
+        # Las lecturas podadas y tipadas se guardan aparte de las completas
+        spec = (sorted((sheet, tuple(cols.items())) for sheet, cols in columns.items()), DATE_FORMATS, SCHEMA_VERSION)
+        key += '_' + fingerprint(repr(spec).encode())[:12]
+    return key
+
+
+def _snapshot_names(columns):
+    return SHEETS if columns is None else SHEETS + (INVALID_ROWS,)
+
+
+def _load_or_parse(key, xls_path, columns):
+    names = _snapshot_names(columns)
+    with stage("lectura de snapshot"):
+        sheets = snapshot.load(key, names)
+    if sheets is None:
+        data = read_bytes(xls_path)
+        with stage("parseo de hojas", bytes=len(data)):
+            sheets = _parse_sheets(data, columns)
+        if columns is not None:
+            with stage("esquema"):
+                sheets = coerce_sheets(sheets, columns)
+        with stage("escritura de snapshot"):
+            snapshot.save(key, names, sheets)
+    return sheets
+
+
+def _sheets_with_invalid(xls_path, columns):
+    key = _snapshot_key(xls_path, columns)
+    return cached(_sheets, key, lambda: _load_or_parse(key, xls_path, columns))
+
+
+def _ensure_snapshot(xls_path, columns):
+    """Clave del snapshot de las hojas tipadas, escribiéndolo si falta sin cachear las hojas.
+
+    Las lecturas sobre el snapshot (DuckDB, filas inválidas, columnas sueltas) no
+    necesitan las hojas completas en memoria: tras escribirlo se liberan. Si no
+    pudieron guardarse en Arrow quedan en la caché para el cálculo con pandas.
+    """
+    key = _snapshot_key(xls_path, columns)
+    names = _snapshot_names(columns)
+
+    def write():
+        if snapshot.paths(key, names) is None and key not in _sheets:
+            sheets = _load_or_parse(key, xls_path, columns)
+            if snapshot.paths(key, names) is None:
+                _sheets.put(key, sheets)
+
+    if snapshot.paths(key, names) is None and key not in _sheets:
+        run((_sheets.name, "snapshot", key), write)
+    return key
+
+
+def _snapshot_tables(xls_path, names, columns, selected=None):
+    """Tablas `names` del snapshot tipado (sólo las columnas `selected`), o None sin snapshot."""
+    key = _ensure_snapshot(xls_path, columns)
+    with stage("lectura de snapshot"):
+        return snapshot.load(key, names, selected)
+
+
+def load_sheets(xls_path, columns=None):
+    """Devuelve las hojas 'Desembolsos' y 'Operaciones', parseando el libro una sola vez por contenido.
+
+    Con `columns` ({hoja: {columna: tipo}}, ver schema.CURVE_COLUMNS) el libro se
+    recorre en streaming, sólo se conservan las columnas declaradas y se aplica el
+    esquema: los valores inválidos quedan en `invalid_rows`.
+    """
+    return _sheets_with_invalid(xls_path, columns)[:len(SHEETS)]
+
+
+def snapshot_paths(xls_path, columns=CURVE_COLUMNS, parquet=False):
+    """Rutas de los snapshots de las hojas tipadas, parseando el libro si aún no existen.
+
+    Con `parquet` devuelve la copia Parquet del snapshot. Devuelve None si las
+    hojas no pudieron guardarse en Arrow.
+    """
+    key = _ensure_snapshot(xls_path, columns)
+    if parquet:
+        return snapshot.parquet_paths(key, SHEETS)
+    return snapshot.paths(key, SHEETS)
+
+
+def invalid_rows(xls_path, columns=CURVE_COLUMNS):
+    """Valores del libro que no cumplen el esquema de `columns` (ver schema.coerce_sheets).
+
+    Si las hojas no están en la caché se lee sólo esa tabla del snapshot.
+    """
+    key = _snapshot_key(xls_path, columns)
+    sheets = _sheets.get(key)
+    if sheets is not None:
+        return sheets[len(SHEETS)]
+
+    def compute():
+        tables = _snapshot_tables(xls_path, (INVALID_ROWS,), columns)
+        return tables[0] if tables is not None else _sheets_with_invalid(xls_path, columns)[len(SHEETS)]
+
+    return cached(_results, (key, INVALID_ROWS), compute)
+
+
+def read_columns(xls_path, sheet, names, columns=CURVE_COLUMNS):
+    """Columnas `names` de la hoja tipada `sheet`.
+
+    Si las hojas no están en la caché se leen sólo esas columnas del snapshot,
+    sin cargar las demás en memoria.
+    """
+    sheets = _sheets.get(_snapshot_key(xls_path, columns))
+    if sheets is None:
+        tables = _snapshot_tables(xls_path, (sheet,), columns, names)
+        if tables is not None:
+            return tables[0]
+        sheets = _sheets_with_invalid(xls_path, columns)
+    return sheets[SHEETS.index(sheet)][names]
+
+
+def cached_result(xls_path, name, compute):
+    """Devuelve compute(xls_path) cacheado por huella del archivo y nombre del cálculo.
+
+    Los DataFrames devueltos se comparten entre reruns y sesiones: no deben modificarse.
+    """
+    key = (workbook_digest(xls_path), name)
+    return cached(_results, key, lambda: compute(xls_path))
@@ -0,0 +1,110 @@
+import datetime as dt
+import io
+import math
+from array import array
+
+import numpy as np
+import pandas as pd
+
+_EPOCH = dt.datetime(1970, 1, 1)
+_MICROSECOND = dt.timedelta(microseconds=1)
+
+
+class _ObjectColumn:
+    def __init__(self):
+        self.values = []
+
+    def append(self, value):
+        self.values.append(value)
+
+    def finish(self):
+        return np.array(self.values, dtype=object)
+
+
+class _FloatColumn:
+    """Números como float64; si aparece un valor no numérico, la columna pasa a objetos."""
+
+    def __init__(self):
+        self.values = array('d')
+        self.objects = None
+
+    def append(self, value):
+        if self.objects is None:
+            if value is None:
+                self.values.append(math.nan)
+                return
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.values.append(value)
+                return
+            self.objects = [None if math.isnan(number) else number for number in self.values]
+        self.objects.append(value)
+
+    def finish(self):
+        if self.objects is None:
+            return np.frombuffer(self.values, dtype=np.float64)
+        return np.array(self.objects, dtype=object)
+
+
+class _DateColumn:
+    """Fechas como enteros en microsegundos; si aparece texto, la columna pasa a objetos."""
+
+    def __init__(self):
+        self.values = array('q')
+        self.objects = None
+
+    def append(self, value):
+        if self.objects is None:
+            if isinstance(value, dt.datetime):
+                self.values.append((value - _EPOCH) // _MICROSECOND)
+                return
+            if value is None:
+                self.values.append(np.iinfo(np.int64).min)  # NaT
+                return
+            self.objects = list(self._timestamps())
+        self.objects.append(value)
+
+    def _timestamps(self):
+        return pd.to_datetime(np.frombuffer(self.values, dtype='datetime64[us]'))
+
+    def finish(self):
+        if self.objects is None:
+            return np.frombuffer(self.values, dtype=np.int64).view('datetime64[us]')
+        return np.array(self.objects, dtype=object)
+
+
+_BUILDERS = {'object': _ObjectColumn, 'float': _FloatColumn, 'date': _DateColumn}
+
+
+def read_columns(data, sheet_name, columns):
+    """Lee sólo `columns` ({nombre: 'object' | 'float' | 'date'}) de una hoja, fila a fila.
+
+    Usa openpyxl en modo de sólo lectura, de modo que nunca se materializa la hoja
+    completa: cada celda de interés se vuelca directamente a un arreglo tipado.
+    Las columnas con valores de otro tipo se devuelven como objetos, para que
+    schema.coerce_sheets los convierta o los informe.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        sheet = workbook[sheet_name]
+        # Las dimensiones declaradas en el archivo pueden ser incorrectas
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, ())
+        missing = [name for name in columns if name not in header]
+        if missing:
+            raise KeyError(f"Faltan las columnas {missing} en la hoja '{sheet_name}'")
+
+        positions = [header.index(name) for name in columns]
+        builders = [_BUILDERS[kind]() for kind in columns.values()]
+        for row in rows:
+            values = [row[i] if i < len(row) else None for i in positions]
+            if all(value is None for value in values):
+                continue
+            for builder, value in zip(builders, values):
+                builder.append(value)
+    finally:
+        workbook.close()
+
+    return pd.DataFrame({name: builder.finish() for name, builder in zip(columns, builders)}, copy=False)